@@ -1,4 +1,23 @@
-from net_worth_tracker import brand_new_day, degiro, manual, mint, plots, utils
+from net_worth_tracker import (
+    brand_new_day,
+    cache,
+    correlation,
+    cost_basis,
+    degiro,
+    delta,
+    fetch,
+    http_client,
+    labels,
+    lots,
+    manual,
+    mint,
+    panel,
+    performance,
+    plots,
+    snapshot_index,
+    store,
+    utils,
+)
 from net_worth_tracker.crypto import (
     apeboard,
     beefy,
@@ -9,7 +28,7 @@ from net_worth_tracker.crypto import (
     nexo,
     yearn,
 )
-from net_worth_tracker.ignore import ignore_symbols
+from net_worth_tracker.ignore import ignore_symbols, ignore_wallets
 
 __all__ = [
     "apeboard",
@@ -17,14 +36,27 @@ __all__ = [
     "binance_smart_chain",
     "binance",
     "brand_new_day",
+    "cache",
     "coin_gecko",
+    "correlation",
+    "cost_basis",
     "degiro",
+    "delta",
     "exodus",
+    "fetch",
+    "http_client",
     "ignore_symbols",
+    "ignore_wallets",
+    "labels",
+    "lots",
     "manual",
     "mint",
     "nexo",
+    "panel",
+    "performance",
     "plots",
+    "snapshot_index",
+    "store",
     "utils",
     "yearn",
 ]
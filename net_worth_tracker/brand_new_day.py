@@ -1,4 +1,3 @@
-from functools import lru_cache
 from typing import Optional
 
 from selenium import webdriver
@@ -10,10 +9,11 @@ from selenium.webdriver.support.expected_conditions import (
 )
 from selenium.webdriver.support.ui import WebDriverWait
 
+from .cache import MINUTE, disk_cache
 from .utils import get_password
 
 
-@lru_cache
+@disk_cache(ttl=10 * MINUTE)
 def scrape_brand_new_day(
     username: Optional[str] = None,
     password: Optional[str] = None,
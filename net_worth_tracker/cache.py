@@ -0,0 +1,187 @@
+"""On-disk cache for the functions that fetch or parse data.
+
+`functools.lru_cache` only lives as long as the process (e.g., a single
+nbconvert run), `disk_cache` pickles the result per function and arguments
+in ``CACHE_FOLDER`` and reuses it for ``ttl`` seconds, across processes.
+`file_cache` reuses the result of parsing a file for as long as the file is
+unchanged (the same path, size and modification time), so an unchanged
+export costs a ``stat`` instead of a parse. When the folder grows beyond its
+``max_size`` the least recently used entries are removed. Pass
+``cache=False`` to a decorated function to bypass the cache (the fresh
+result is still stored).
+"""
+from __future__ import annotations
+
+import contextlib
+import functools
+import hashlib
+import inspect
+import json
+import math
+import os
+import pickle
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+CACHE_FOLDER = Path(
+    os.environ.get("NET_WORTH_TRACKER_CACHE", "~/.cache/net_worth_tracker")
+).expanduser()
+MAX_SIZE = 256 * 1024**2  # bytes
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+_MISSING = object()
+
+
+def cache_key(*args) -> str:
+    """A short hash of ``args``, which must be JSON serializable (or have a
+    stable `str`)."""
+    return hashlib.sha1(json.dumps(args, default=str).encode()).hexdigest()[:16]
+
+
+def _read(fname: Path, ttl: float):
+    try:
+        with fname.open("rb") as f:
+            created, result = pickle.load(f)
+    except Exception:  # missing, or written by another version
+        return _MISSING
+    if time.time() - created > ttl:
+        return _MISSING
+    # The modification time orders the entries for eviction
+    with contextlib.suppress(FileNotFoundError):
+        os.utime(fname)
+    return result
+
+
+def _write(fname: Path, result) -> None:
+    fname.parent.mkdir(parents=True, exist_ok=True)
+    # A unique temporary file, because sources are fetched concurrently
+    fd, tmp = tempfile.mkstemp(dir=fname.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((time.time(), result), f)
+        os.replace(tmp, fname)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _evict(folder: Path, max_size: int) -> None:
+    entries = []
+    for fname in folder.glob("*.pickle"):
+        try:
+            stat = fname.stat()
+        except FileNotFoundError:  # removed by another process
+            continue
+        entries.append((stat.st_mtime, stat.st_size, fname))
+    size = sum(s for _, s, _ in entries)
+    for _, s, fname in sorted(entries, key=lambda x: x[0]):
+        if size <= max_size:
+            break
+        fname.unlink(missing_ok=True)
+        size -= s
+
+
+def clear(folder: Path | None = None) -> None:
+    """Remove all cached results."""
+    for fname in Path(folder or CACHE_FOLDER).glob("*.pickle"):
+        fname.unlink(missing_ok=True)
+
+
+def _cached(name, key, compute, ttl, folder, max_size, cache):
+    cache_folder = Path(folder or CACHE_FOLDER)
+    fname = cache_folder / f"{name}-{cache_key(*key)}.pickle"
+    if cache:
+        result = _read(fname, ttl)
+        if result is not _MISSING:
+            return result
+    result = compute()
+    _write(fname, result)
+    _evict(cache_folder, max_size)
+    return result
+
+
+def _cache_clear(name, folder) -> Callable[[], None]:
+    def cache_clear() -> None:
+        for fname in Path(folder or CACHE_FOLDER).glob(f"{name}-*.pickle"):
+            fname.unlink(missing_ok=True)
+
+    return cache_clear
+
+
+def _bind(signature: inspect.Signature, args, kwargs):
+    """The bound arguments (with the defaults applied) and their values for
+    the key, such that e.g. ``f(1)`` and ``f(x=1)`` share a key."""
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    values = [
+        sorted(value.items())
+        if signature.parameters[name].kind is inspect.Parameter.VAR_KEYWORD
+        else value
+        for name, value in bound.arguments.items()
+    ]
+    return bound, values
+
+
+def disk_cache(
+    ttl: float, folder: Path | None = None, max_size: int = MAX_SIZE
+) -> Callable[[Callable], Callable]:
+    """Cache the results of the decorated function on disk for ``ttl`` seconds.
+
+    The arguments (bound to the signature, with the defaults applied) are part
+    of the key, see `cache_key`, and the result must be picklable. ``folder``
+    defaults to ``CACHE_FOLDER`` at call time.
+    """
+
+    def decorator(f: Callable) -> Callable:
+        name = f"{f.__module__}.{f.__qualname__}"
+        signature = inspect.signature(f)
+
+        @functools.wraps(f)
+        def wrapper(*args, cache: bool = True, **kwargs):
+            bound, values = _bind(signature, args, kwargs)
+            key = (name, values)
+            compute = functools.partial(f, *bound.args, **bound.kwargs)
+            return _cached(name, key, compute, ttl, folder, max_size, cache)
+
+        wrapper.cache_clear = _cache_clear(name, folder)
+        return wrapper
+
+    return decorator
+
+
+def file_key(fname) -> tuple[str, int, int]:
+    """The resolved path, size and modification time (ns) of ``fname``."""
+    path = Path(fname).expanduser().resolve()
+    stat = path.stat()
+    return str(path), stat.st_size, stat.st_mtime_ns
+
+
+def file_cache(
+    folder: Path | None = None, max_size: int = MAX_SIZE
+) -> Callable[[Callable], Callable]:
+    """Cache the results of the decorated function on disk for as long as the
+    file that is its first argument is unchanged, see `file_key`.
+
+    The other arguments are part of the key, like in `disk_cache`.
+    """
+
+    def decorator(f: Callable) -> Callable:
+        name = f"{f.__module__}.{f.__qualname__}"
+        signature = inspect.signature(f)
+
+        @functools.wraps(f)
+        def wrapper(*args, cache: bool = True, **kwargs):
+            bound, (fname, *rest) = _bind(signature, args, kwargs)
+            key = (name, file_key(fname), rest)
+            compute = functools.partial(f, *bound.args, **bound.kwargs)
+            return _cached(name, key, compute, math.inf, folder, max_size, cache)
+
+        wrapper.cache_clear = _cache_clear(name, folder)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,169 @@
+"""Correlation and covariance of the returns of all symbols.
+
+The log returns are taken on a regular grid, like `performance.grid`. Missing
+data is handled pairwise, like `pandas.DataFrame.cov` and `~pandas.DataFrame.corr`
+do: every pair only uses the dates on which both symbols have a return. Both
+follow from the same sums over the dates (the number of common dates, the sums
+and the sums of products), which are matrix products of the returns and their
+validity mask. `moments` computes these sums once, such that both matrices (at
+any ``min_periods``) follow without recomputing the returns, and caches them
+per `data_version`, ``freq`` and ``window``, so repeated calls (e.g., for
+several ``min_periods``) recompute them only when a snapshot was added.
+`RollingCovariance` updates them by adding the new and subtracting the old
+dates.
+"""
+from __future__ import annotations
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from net_worth_tracker.panel import Panel
+
+_CACHE: dict[tuple, Moments] = {}
+_CACHE_SIZE = 16
+
+
+class Moments:
+    """Pairwise sums over the dates on which both symbols have a return."""
+
+    def __init__(self, symbols=()):
+        self.symbols = pd.Index(symbols)
+        shape = (len(self.symbols), len(self.symbols))
+        self.n = np.zeros(shape)  # number of common dates
+        self.sx = np.zeros(shape)  # sum of x_i over the common dates of (i, j)
+        self.sxx = np.zeros(shape)  # sum of x_i²
+        self.sxy = np.zeros(shape)  # sum of x_i x_j
+
+    def add(self, returns: np.ndarray, sign: float = 1.0) -> None:
+        valid = (~np.isnan(returns)).astype(float)
+        x = np.nan_to_num(returns)
+        self.n += sign * (valid.T @ valid)
+        self.sx += sign * (x.T @ valid)
+        self.sxx += sign * ((x * x).T @ valid)
+        self.sxy += sign * (x.T @ x)
+
+    def grow(self, symbols: pd.Index) -> None:
+        """Append the columns of the ``symbols`` that are new (without dates)."""
+        pad = len(symbols) - len(self.symbols)
+        self.symbols = symbols
+        for name in ("n", "sx", "sxx", "sxy"):
+            setattr(self, name, np.pad(getattr(self, name), (0, pad)))
+
+    def covariance(self, min_periods: int = 2) -> pd.DataFrame:
+        """The covariance matrix, NaN for pairs with fewer than ``min_periods``
+        common dates."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = (self.sxy - self.sx * self.sx.T / self.n) / (self.n - 1)
+        cov = np.where(self.n >= max(min_periods, 2), cov, np.nan)
+        return pd.DataFrame(cov, self.symbols, self.symbols)
+
+    def correlation(self, min_periods: int = 2) -> pd.DataFrame:
+        """The correlation matrix, see `covariance`."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = self.sxx - self.sx**2 / self.n  # of i over the common dates
+            corr = (self.sxy - self.sx * self.sx.T / self.n) / np.sqrt(var * var.T)
+        corr = np.clip(corr, -1, 1)
+        corr = np.where(self.n >= max(min_periods, 2), corr, np.nan)
+        return pd.DataFrame(corr, self.symbols, self.symbols)
+
+
+def log_returns(df: pd.DataFrame, freq: str = "1D") -> pd.DataFrame:
+    """The log returns of the price of every symbol on a regular grid."""
+    prices = Panel.from_df(df).resample(freq).frame("price")
+    return np.log(prices / prices.shift(1)).iloc[1:]
+
+
+def data_version(df: pd.DataFrame) -> tuple:
+    """The number of rows, the last date and the sum of the prices of ``df``,
+    which change when a snapshot is added (or a price is changed in place)."""
+    return len(df), str(df.date.max()), float(np.nansum(df.price.to_numpy()))
+
+
+def moments(df: pd.DataFrame, freq: str = "1D", window: str | None = None) -> Moments:
+    """The (cached) `Moments` of the log returns over the last ``window``
+    (e.g., ``"90D"``, None for all dates); keep them to get both the
+    `Moments.covariance` and `Moments.correlation` of the same frame and
+    treat them as read-only."""
+    key = (data_version(df), freq, window)
+    if key in _CACHE:
+        return _CACHE[key]
+    returns = log_returns(df, freq)
+    if window is not None:
+        returns = returns[returns.index > returns.index[-1] - pd.Timedelta(window)]
+    result = Moments(returns.columns)
+    result.add(returns.to_numpy())
+    if len(_CACHE) >= _CACHE_SIZE:
+        del _CACHE[next(iter(_CACHE))]  # the oldest entry
+    _CACHE[key] = result
+    return result
+
+
+def covariance(
+    df: pd.DataFrame,
+    freq: str = "1D",
+    window: str | None = None,
+    min_periods: int = 2,
+) -> pd.DataFrame:
+    """The covariance matrix of the log returns over the last ``window``, see
+    `moments`; NaN for pairs with fewer than ``min_periods`` common dates."""
+    return moments(df, freq, window).covariance(min_periods)
+
+
+def correlation(
+    df: pd.DataFrame,
+    freq: str = "1D",
+    window: str | None = None,
+    min_periods: int = 2,
+) -> pd.DataFrame:
+    """The correlation matrix of the log returns, see `covariance`."""
+    return moments(df, freq, window).correlation(min_periods)
+
+
+class RollingCovariance:
+    """Covariance and correlation over the last ``window`` returns that are
+    updated in O(symbols² · new returns) instead of O(symbols² · window).
+
+    The sums are recomputed from the kept returns once every ``window``
+    updated returns, so rounding errors do not accumulate.
+    """
+
+    def __init__(self, window: int, min_periods: int = 2):
+        self.window = window
+        self.min_periods = min_periods
+        self.rows: deque[np.ndarray] = deque()
+        self.moments = Moments()
+        self._since_refresh = 0
+
+    def update(self, returns: pd.DataFrame) -> None:
+        """Add the new rows of ``returns`` (dates × symbols, e.g., the new
+        rows of `log_returns`); symbols that are new are added as columns."""
+        new_symbols = returns.columns.difference(self.symbols, sort=False)
+        if len(new_symbols):
+            self.moments.grow(self.symbols.append(new_symbols))
+            n = len(self.symbols)
+            self.rows = deque(
+                np.pad(r, (0, n - len(r)), constant_values=np.nan) for r in self.rows
+            )
+        new = returns.reindex(columns=self.symbols).to_numpy(dtype=float)
+        self.moments.add(new)
+        self.rows.extend(new)
+        old = [self.rows.popleft() for _ in range(len(self.rows) - self.window)]
+        if old:
+            self.moments.add(np.array(old), sign=-1.0)
+        self._since_refresh += len(new)
+        if self._since_refresh >= self.window:
+            self.moments = Moments(self.symbols)
+            self.moments.add(np.array(self.rows))
+            self._since_refresh = 0
+
+    @property
+    def symbols(self) -> pd.Index:
+        return self.moments.symbols
+
+    def covariance(self) -> pd.DataFrame:
+        return self.moments.covariance(self.min_periods)
+
+    def correlation(self) -> pd.DataFrame:
+        return self.moments.correlation(self.min_periods)
@@ -0,0 +1,131 @@
+"""Persisted cost-basis state.
+
+`utils.add_avg_price` recomputes the ``avg_price`` of every symbol from the
+very first snapshot. This module persists the per-symbol state of that
+computation (the last ``amount``, the ``first_value`` and the running
+``Δvalue_sum``, such that the total spend is ``first_value + Δvalue_sum``) in
+``<folder>/cost_basis-<key>.json``, together with the date of the last
+ingested snapshot. `ingest` then only processes the newer snapshots, which is
+O(symbols) per snapshot, and `rebuild` recomputes the state from all snapshots
+and verifies the persisted one against it.
+"""
+from __future__ import annotations
+
+import datetime
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from net_worth_tracker import snapshot_index
+from net_worth_tracker.cache import cache_key
+from net_worth_tracker.utils import RENAMES, _add_avg_price, _datas_to_df, _read_fnames
+
+STATE_COLUMNS = ["amount", "first_value", "Δvalue_sum"]
+
+
+def _fname(folder, prefix, ignore, ignore_symbols, renames) -> Path:
+    key = cache_key(
+        prefix, sorted(ignore), sorted(ignore_symbols), sorted(renames.items())
+    )
+    return Path(folder) / f"cost_basis-{key}.json"
+
+
+def _load(fname: Path) -> tuple[datetime.datetime | None, pd.DataFrame | None]:
+    if not fname.exists():
+        return None, None
+    with fname.open() as f:
+        data = json.load(f)
+    state = pd.DataFrame.from_dict(data["state"], orient="index", dtype=float)
+    state = state.reindex(columns=STATE_COLUMNS)
+    return datetime.datetime.fromisoformat(data["date"]), state
+
+
+def _save(fname: Path, date: datetime.datetime, state: pd.DataFrame) -> None:
+    data = dict(date=date.isoformat(), state=state.to_dict(orient="index"))
+    tmp = fname.with_suffix(".tmp")
+    with tmp.open("w") as f:
+        json.dump(data, f, indent="  ")
+    tmp.replace(fname)
+
+
+def load(
+    folder=Path("data"),
+    prefix: str = "",
+    ignore=(),
+    ignore_symbols=(),
+    renames=RENAMES,
+) -> tuple[datetime.datetime | None, pd.DataFrame | None]:
+    """The date of the last ingested snapshot and the state indexed by symbol,
+    or ``(None, None)`` if nothing was ingested yet."""
+    return _load(_fname(folder, prefix, ignore, ignore_symbols, renames))
+
+
+def ingest(
+    folder=Path("data"),
+    prefix: str = "",
+    ignore=(),
+    ignore_symbols=(),
+    renames=RENAMES,
+) -> pd.DataFrame | None:
+    """Update the persisted state with the snapshots that are newer than it.
+
+    Returns the `utils.datas_to_df` rows (including ``avg_price``) of the
+    new snapshots, or None if there were none.
+    """
+    fname = _fname(folder, prefix, ignore, ignore_symbols, renames)
+    date, state = _load(fname)
+    fnames = snapshot_index.query(folder, prefix, ".json", start=date)
+    fnames = {dt: f for dt, f in fnames.items() if date is None or dt > date}
+    if not fnames:
+        return None
+    df = _datas_to_df(_read_fnames(fnames), ignore, ignore_symbols, renames)
+    df, state = _add_avg_price(df, state)
+    _save(fname, max(fnames), state)
+    return df
+
+
+def _compare(state: pd.DataFrame, expected: pd.DataFrame) -> list[str]:
+    """The symbols for which ``state`` differs from ``expected``."""
+    symbols = expected.index.union(state.index)
+    a = state.reindex(symbols).to_numpy(dtype=float)
+    b = expected.reindex(symbols).to_numpy(dtype=float)
+    ok = np.isclose(a, b, rtol=1e-9, atol=1e-9, equal_nan=True).all(axis=1)
+    return list(symbols[~ok])
+
+
+def rebuild(
+    folder=Path("data"),
+    prefix: str = "",
+    ignore=(),
+    ignore_symbols=(),
+    renames=RENAMES,
+    verify: bool = True,
+) -> list[str]:
+    """Recompute the state from all snapshots and persist it.
+
+    With ``verify`` the persisted state (if any) is first compared with the
+    recomputation up to its date. Returns the symbols that did not match.
+    """
+    fname = _fname(folder, prefix, ignore, ignore_symbols, renames)
+    fnames = snapshot_index.query(folder, prefix, ".json")
+    if not fnames:
+        return []
+    df = _datas_to_df(_read_fnames(fnames), ignore, ignore_symbols, renames)
+    mismatches = []
+    date, state = _load(fname)
+    if verify and state is not None:
+        _, expected = _add_avg_price(df[df.date <= pd.Timestamp(date)])
+        mismatches = _compare(state, expected)
+    _, state = _add_avg_price(df)
+    _save(fname, max(fnames), state)
+    return mismatches
+
+
+if __name__ == "__main__":
+    mismatches = rebuild()
+    if mismatches:
+        print(f"Rebuilt the cost-basis state, it differed for: {mismatches}")
+    else:
+        print("Rebuilt the cost-basis state, it matched the persisted one")
@@ -15,9 +15,8 @@ from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
 from selenium.webdriver.support.expected_conditions import presence_of_element_located
 from selenium.webdriver.support.ui import WebDriverWait
 
-from net_worth_tracker.utils import combine_balances, euro_per_dollar
-
-from .utils import get_password
+from net_worth_tracker.cache import file_cache
+from net_worth_tracker.utils import combine_balances, euro_per_dollar, get_password
 
 FOLDER = Path(__file__).parent.parent / "apeboard_data"
 FOLDER.mkdir(parents=True, exist_ok=True)
@@ -82,11 +81,16 @@ def download_from_apeboard(
         shutil.move(fname, FOLDER / fname.name)
 
 
+@file_cache()
+def _read_csv(fname) -> pd.DataFrame:
+    return pd.read_csv(fname)
+
+
 def load_last_data(split_tri_pool=True, with_price_and_value=False):
     last_positions = sorted(FOLDER.glob("Export Positions *.csv"))[-1]
     last_wallets = sorted(FOLDER.glob("Export Wallets *.csv"))[-1]
-    positions = pd.read_csv(last_positions)
-    wallets = pd.read_csv(last_wallets)
+    positions = _read_csv(last_positions)
+    wallets = _read_csv(last_wallets)
 
     # Make into list of single dicts because there can be
     # multiple entries for a single coin
@@ -127,7 +131,7 @@ def load_last_data(split_tri_pool=True, with_price_and_value=False):
 
 
 def split_out_atricrypto(balances_defi, name="CRVUSDBTCETH"):
-    from net_worth_tracker.coin_gecko import get_prices
+    from net_worth_tracker.crypto.coin_gecko import get_prices
 
     prices = get_prices(dict(BTC=None, ETH=None, USDT=None))
 
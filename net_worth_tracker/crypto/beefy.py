@@ -1,12 +1,11 @@
 from __future__ import annotations
 
-from functools import lru_cache
-
 import js2py
-import requests
 from web3 import HTTPProvider, Web3
 from web3.middleware import geth_poa_middleware
 
+from net_worth_tracker import http_client
+from net_worth_tracker.cache import DAY, MINUTE, disk_cache
 from net_worth_tracker.utils import euro_per_dollar
 
 # from https://github.com/beefyfinance/beefy-app/blob/edbf199aee36728f06e16c05af1a2af36475f068/src/common/networkSetup.js
@@ -25,10 +24,10 @@ RPCS = {
 GITHUB_RAW = "https://raw.githubusercontent.com/beefyfinance/beefy-app/master"
 
 
-@lru_cache
+@disk_cache(ttl=7 * DAY)
 def get_abis():
     # Get ABIs for Beefy
-    r = requests.get(f"{GITHUB_RAW}/src/features/configure/abi.js")
+    r = http_client.get(f"{GITHUB_RAW}/src/features/configure/abi.js")
 
     abis = {}
     for line in r.text.split("\n"):
@@ -38,17 +37,17 @@ def get_abis():
     return abis
 
 
-@lru_cache
+@disk_cache(ttl=10 * MINUTE)
 def get_prices():
     oracles = {
-        "lps": requests.get("https://api.beefy.finance/lps").json(),
-        "tokens": requests.get("https://api.beefy.finance/prices").json(),
-        "apy": requests.get("https://api.beefy.finance/apy").json(),
+        "lps": http_client.get("https://api.beefy.finance/lps").json(),
+        "tokens": http_client.get("https://api.beefy.finance/prices").json(),
+        "apy": http_client.get("https://api.beefy.finance/apy").json(),
     }
     return oracles
 
 
-@lru_cache
+@disk_cache(ttl=DAY)
 def get_pools():
     networks = [
         "arbitrum",
@@ -64,7 +63,7 @@ def get_pools():
     base = GITHUB_RAW + "/src/features/configure/vault/{name}_pools.js"
     pools = {}
     for network in networks:
-        r = requests.get(base.format(name=network))
+        r = http_client.get(base.format(name=network))
         text = r.text.split(" = ")
         assert len(text) == 2
         lst = js2py.eval_js(text[1]).to_list()
@@ -72,13 +71,13 @@ def get_pools():
     return pools
 
 
-@lru_cache
+@disk_cache(ttl=7 * DAY)
 def get_abi_poly(id):
     addr = get_pools()["polygon"][id]["tokenAddress"]
     url = (
         f"https://api.polygonscan.com/api?module=contract&action=getabi&address={addr}"
     )
-    r = requests.get(url)
+    r = http_client.get(url)
     return r.json()["result"]
 
 
@@ -1,10 +1,10 @@
 from collections import defaultdict
-from functools import lru_cache
 
 from binance.client import Client
 from binance.exceptions import BinanceAPIException
 
-from .utils import read_config
+from net_worth_tracker.cache import MINUTE, disk_cache
+from net_worth_tracker.utils import read_config
 
 
 def get_binance_client() -> Client:
@@ -12,7 +12,7 @@ def get_binance_client() -> Client:
     return Client(config["api_key"], config["api_secret"])
 
 
-@lru_cache
+@disk_cache(ttl=10 * MINUTE)
 def get_binance_balances():
     client = get_binance_client()
     balances = defaultdict(float)
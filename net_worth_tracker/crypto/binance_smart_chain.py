@@ -1,11 +1,12 @@
-import time
 from collections import defaultdict
-from functools import lru_cache
 from typing import Literal, Optional
 
-import requests
+import numpy as np
+import pandas as pd
 from bscscan import BscScan
 
+from net_worth_tracker import http_client
+from net_worth_tracker.cache import MINUTE, disk_cache
 from net_worth_tracker.utils import euro_per_dollar, read_config
 
 IGNORE_TOKENS = {"VERA"}
@@ -21,10 +22,10 @@ RENAMES = {
     "Cake": "CAKE",
     "sBDO": "SBDO",
 }
+BEP20_RENAMES = {"Belt.fi bDAI/bUSDC/bUSDT/bBUSD": "BUSD"}
 
 
-@lru_cache
-def get_bep20_balances(my_address: Optional[str] = None, api_key: Optional[str] = None):
+def _bep20_transfers(my_address: Optional[str], api_key: Optional[str]):
     config = read_config()
     if my_address is None:
         my_address = config["bsc"]["address"]
@@ -36,6 +37,12 @@ def get_bep20_balances(my_address: Optional[str] = None, api_key: Optional[str]
     txs = bsc.get_bep20_token_transfer_events_by_address(
         address=my_address, startblock=0, endblock=999999999, sort="asc"
     )
+    return bsc, my_address, txs
+
+
+@disk_cache(ttl=10 * MINUTE)
+def get_bep20_balances(my_address: Optional[str] = None, api_key: Optional[str] = None):
+    bsc, my_address, txs = _bep20_transfers(my_address, api_key)
     balances = defaultdict(float)
     for d in txs:
         symbol = d["tokenSymbol"]
@@ -55,14 +62,36 @@ def get_bep20_balances(my_address: Optional[str] = None, api_key: Optional[str]
     # Remove 0 or negative balances
     # TODO: why can it become negative?
     balances = {k: v for k, v in balances.items() if v > 0}
-    renames = {"Belt.fi bDAI/bUSDC/bUSDT/bBUSD": "BUSD"}
-    for old, new in renames.items():
+    for old, new in BEP20_RENAMES.items():
         if old in balances:
             balances[new] = balances.pop(old)
 
     return {k: dict(amount=v) for k, v in balances.items()}
 
 
+@disk_cache(ttl=10 * MINUTE)
+def get_bep20_transactions(
+    my_address: Optional[str] = None, api_key: Optional[str] = None
+) -> pd.DataFrame:
+    """The ``(date, symbol, amount, price)`` BEP20 transfers for
+    `net_worth_tracker.lots`; transfers carry no price, so ``price`` is NaN."""
+    _, my_address, txs = _bep20_transfers(my_address, api_key)
+    df = pd.DataFrame(
+        txs, columns=["timeStamp", "tokenSymbol", "to", "value", "tokenDecimal"]
+    )
+    df = df[~df.tokenSymbol.isin(IGNORE_TOKENS)]
+    sign = np.where(df["to"].str.lower() == my_address, 1.0, -1.0)
+    factor = 10.0 ** df.tokenDecimal.astype(int)
+    return pd.DataFrame(
+        {
+            "date": pd.to_datetime(df.timeStamp.astype(int), unit="s"),  # UTC
+            "symbol": df.tokenSymbol.replace(BEP20_RENAMES),
+            "amount": sign * df["value"].astype(float) / factor,
+            "price": np.nan,
+        }
+    ).reset_index(drop=True)
+
+
 def get_wallet_balances_from_yieldwatch(
     raw: dict, base="EUR", minimum_value: float = 1.0
 ):
@@ -81,7 +110,7 @@ def get_wallet_balances_from_yieldwatch(
     return balances
 
 
-@lru_cache
+@disk_cache(ttl=10 * MINUTE)
 def get_yieldwatch_balances(  # noqa: C901
     my_address: Optional[str] = None,
     return_raw_data: bool = False,
@@ -130,18 +159,12 @@ def get_yieldwatch_balances(  # noqa: C901
     url = (
         f"https://www.yieldwatch.net/api/{which}/{my_address}?platforms={platforms_str}"
     )
-    for i in range(3):
-        kwargs = {}
-        if bearer_token is not None:
-            kwargs["headers"] = {"Authorization": f"Bearer {bearer_token}"}
-        req = requests.get(url, **kwargs)
-        response = req.json()
-        if "result" in response:
-            raw_data = response["result"]
-            break
-        elif i == 2:
-            raise RuntimeError("Tried trice and failed getting YieldWatch")
-        time.sleep(2)
+    headers = {}
+    if bearer_token is not None:
+        headers["Authorization"] = f"Bearer {bearer_token}"
+    # YieldWatch sometimes responds without a "result", which is retried too
+    response = http_client.get(url, headers=headers, ok=lambda r: "result" in r.json())
+    raw_data = response.json()["result"]
 
     balances = defaultdict(lambda: defaultdict(float))
     for k, v in raw_data.items():
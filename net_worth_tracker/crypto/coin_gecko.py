@@ -1,9 +1,13 @@
+import threading
 from collections import defaultdict
 
 from pycoingecko import CoinGeckoAPI
 
+RENAMES = {"IOTA": "MIOTA", "NANO": "XNO", "WETH.E": "ETH"}
+IGNORE = ("degiro", "brand_new_day")
 
-def get_coins(balances, cg: CoinGeckoAPI):
+
+def get_coins(balances, cg: CoinGeckoAPI, coin_list=None):
     sym2name = {  # mapping for duplicates
         "auto": "Auto",
         "bifi": "Beefy.Finance",
@@ -42,7 +46,8 @@ def get_coins(balances, cg: CoinGeckoAPI):
 
     symbols = [c.lower() for c in balances]
 
-    coin_list = cg.get_coins_list()
+    if coin_list is None:
+        coin_list = cg.get_coins_list()
 
     # Check for duplicate symbols in coin list
     symbol_map = defaultdict(list)
@@ -85,9 +90,9 @@ def get_coins(balances, cg: CoinGeckoAPI):
     return sym2id, id2sym
 
 
-def get_prices(balances):
-    cg = CoinGeckoAPI()
-    sym2id, id2sym = get_coins(balances, cg)
+def get_prices(balances, cg=None, coin_list=None):
+    cg = cg or CoinGeckoAPI()
+    sym2id, id2sym = get_coins(balances, cg, coin_list)
     ids = {sym2id[c.lower()] for c in balances if c.lower() in sym2id}
     ids.add(sym2id["busd"])
     prices = cg.get_price(ids=list(ids), vs_currencies="eur")
@@ -97,18 +102,18 @@ def get_prices(balances):
     return prices
 
 
-def add_value_and_price(balances, ignore=("degiro", "brand_new_day")):
-    renames = {"IOTA": "MIOTA", "NANO": "XNO", "WETH.E": "ETH"}
-    renames_reverse = {v: k for k, v in renames.items()}
-
+def _to_fetch(balances, ignore):
     to_fetch = set()
     for where, bals in balances.items():
         for coin, bal in bals.items():
             if "value" not in bal and where not in ignore:
-                to_fetch.add(renames.get(coin, coin))
-
+                to_fetch.add(RENAMES.get(coin, coin))
     to_fetch.discard("EUR")
-    prices = get_prices(to_fetch)
+    return to_fetch
+
+
+def _set_value_and_price(balances, prices, ignore):
+    renames_reverse = {v: k for k, v in RENAMES.items()}
     for coin, price in list(prices.items()):
         if coin in renames_reverse:
             prices[renames_reverse[coin]] = price
@@ -130,3 +135,65 @@ def add_value_and_price(balances, ignore=("degiro", "brand_new_day")):
                     continue
                 bal["price"] = price
                 bal["value"] = bal["amount"] * price
+
+
+def add_value_and_price(balances, ignore=IGNORE):
+    prices = get_prices(_to_fetch(balances, ignore))
+    _set_value_and_price(balances, prices, ignore)
+
+
+class Pricer:
+    """Price the balances of each source as soon as it is fetched.
+
+    Pass `add` as the ``on_result`` of `net_worth_tracker.fetch.fetch_all` and
+    call `add_value_and_price` once all balances are in. The coin list is
+    downloaded in the background right away, and the symbols that are added
+    while a price request is in flight are coalesced into the next request,
+    so only the symbols of the last source(s) are still priced at the end.
+    """
+
+    def __init__(self, ignore=IGNORE):
+        self.ignore = ignore
+        self.prices = {}
+        self._cg = CoinGeckoAPI()
+        self._queue = set()
+        self._seen = set()
+        self._closed = False
+        self._error = None
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def add(self, where, bals):
+        """Queue the symbols without a ``value`` of the balances of ``where``."""
+        symbols = _to_fetch({where: bals}, self.ignore)
+        with self._cond:
+            self._queue |= symbols - self._seen
+            self._seen |= symbols
+            self._cond.notify()
+
+    def _worker(self):
+        try:
+            coin_list = self._cg.get_coins_list()
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._queue or self._closed)
+                    batch, self._queue = self._queue, set()
+                if not batch:
+                    return
+                self.prices.update(get_prices(batch, self._cg, coin_list))
+        except Exception as e:
+            self._error = e
+
+    def add_value_and_price(self, balances):
+        """Wait for the queued prices and set the ``price`` and ``value`` of
+        ``balances``, like `add_value_and_price` does."""
+        for where, bals in balances.items():
+            self.add(where, bals)  # in case they were not added yet
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        _set_value_and_price(balances, dict(self.prices), self.ignore)
@@ -1,21 +1,31 @@
 import math
 from collections import defaultdict
-from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 
+from net_worth_tracker.cache import file_cache
+
+
+def _csv_fname(csv_fname: Optional[str], csv_folder: str) -> Path:
+    if csv_fname is None:
+        return sorted(Path(csv_folder).expanduser().glob("*all-txs-*.csv"))[-1]
+    return Path(csv_fname).expanduser()
+
 
-@lru_cache
 def get_exodus(
     csv_fname: Optional[str] = None,
     csv_folder: str = "~/Desktop/exodus-exports/",
 ):
-    if csv_fname is None:
-        csv_fname = sorted(Path(csv_folder).expanduser().glob("*all-txs-*.csv"))[-1]
+    return _get_exodus(_csv_fname(csv_fname, csv_folder))
+
+
+@file_cache()
+def _get_exodus(csv_fname: Path):
     balances = defaultdict(float)
-    df = pd.read_csv(Path(csv_fname).expanduser())
+    df = pd.read_csv(csv_fname)
     for i, row in df.iterrows():
         if isinstance(row.INCURRENCY, str) or not math.isnan(row.INCURRENCY):
             balances[row.INCURRENCY] += row.INAMOUNT
@@ -27,3 +37,37 @@ def get_exodus(
             balances[row.FEECURRENCY] += row.FEEAMOUNT
 
     return {k: dict(amount=v) for k, v in balances.items() if v > 1e-12}
+
+
+def get_exodus_transactions(
+    csv_fname: Optional[str] = None,
+    csv_folder: str = "~/Desktop/exodus-exports/",
+) -> pd.DataFrame:
+    """The ``(date, symbol, amount, price)`` transactions for `net_worth_tracker.lots`.
+
+    Every incoming, outgoing, and fee leg of a row is a transaction; the
+    export has no prices, so ``price`` is NaN.
+    """
+    return _get_exodus_transactions(_csv_fname(csv_fname, csv_folder))
+
+
+@file_cache()
+def _get_exodus_transactions(csv_fname: Path) -> pd.DataFrame:
+    df = pd.read_csv(csv_fname)
+    # E.g., "Tue Jun 08 2021 22:44:54 GMT+0200 (Central European Summer Time)",
+    # keep the local time, like the snapshot dates
+    dates = df.DATE.str.replace(r"\s*GMT.*$", "", regex=True)
+    date = pd.to_datetime(dates, format="%a %b %d %Y %H:%M:%S")
+    legs = [
+        pd.DataFrame(
+            {
+                "date": date,
+                "symbol": df[f"{leg}CURRENCY"],
+                "amount": df[f"{leg}AMOUNT"],
+            }
+        )
+        for leg in ["IN", "OUT", "FEE"]
+    ]
+    txs = pd.concat(legs, ignore_index=True).dropna(subset=["symbol", "amount"])
+    txs["price"] = np.nan
+    return txs.sort_values("date", kind="stable", ignore_index=True)
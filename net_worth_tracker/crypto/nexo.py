@@ -1,6 +1,5 @@
 import json
 import time
-from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
@@ -12,7 +11,13 @@ from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
 from selenium.webdriver.support.expected_conditions import text_to_be_present_in_element
 from selenium.webdriver.support.ui import WebDriverWait
 
-from .utils import fname_from_date, get_password
+from net_worth_tracker.cache import file_cache
+from net_worth_tracker.utils import (
+    euro_per_dollar,
+    fname_from_date,
+    get_password,
+    read_json,
+)
 
 RENAMES = {"NEXOBEP2": "NEXO", "NEXONEXO": "NEXO"}
 
@@ -116,11 +121,9 @@ def scrape_nexo_csv(
 
 def load_latest_data(folder=FOLDER):
     last_file = sorted(folder.glob("*.json"))[-1]
-    with last_file.open("r") as f:
-        return json.load(f)
+    return read_json(last_file)
 
 
-@lru_cache
 def get_nexo_balances(folder=FOLDER):
     data = load_latest_data(folder)
     return {
@@ -130,21 +133,26 @@ def get_nexo_balances(folder=FOLDER):
     }
 
 
-@lru_cache
-def get_nexo_balances_from_csv(
-    csv_fname: str = "~/Downloads/nexo_transactions.csv",
-):
+def _fix_amount(x):
+    try:
+        return float(x)
+    except ValueError:
+        a, b = x.split("/")
+        return float(a) + float(b)
+
+
+@file_cache()
+def _read_csv(csv_fname: str) -> pd.DataFrame:
     print("Download csv from https://platform.nexo.io/transactions")
-    df = pd.read_csv(csv_fname)
+    df = pd.read_csv(Path(csv_fname).expanduser())
+    df["Amount"] = df["Amount"].apply(_fix_amount)
+    return df
 
-    def fix_amount(x):
-        try:
-            return float(x)
-        except ValueError:
-            a, b = x.split("/")
-            return float(a) + float(b)
 
-    df["Amount"] = df["Amount"].apply(fix_amount)
+def get_nexo_balances_from_csv(
+    csv_fname: str = "~/Downloads/nexo_transactions.csv",
+):
+    df = _read_csv(csv_fname)
 
     summed = df[df.Type == "Deposit"].groupby("Currency").sum("Amount").to_dict()
     withdraw = df[df.Type == "Withdrawal"].groupby("Currency").sum("Amount").to_dict()
@@ -161,5 +169,26 @@ def get_nexo_balances_from_csv(
     return {k: dict(amount=v) for k, v in balances.items()}
 
 
+def get_nexo_transactions_from_csv(
+    csv_fname: str = "~/Downloads/nexo_transactions.csv",
+) -> pd.DataFrame:
+    """The ``(date, symbol, amount, price)`` deposits, withdrawals, and interest
+    for `net_worth_tracker.lots`, priced with the "USD Equivalent" in euro."""
+    df = _read_csv(csv_fname)
+    df = df[df.Type.isin(["Deposit", "Withdrawal", "Interest"])]
+    date_col = next(c for c in df.columns if c.startswith("Date"))
+    usd = df["USD Equivalent"].astype(str).str.replace(r"[$,]", "", regex=True)
+    value = pd.to_numeric(usd, errors="coerce") * euro_per_dollar()
+    txs = pd.DataFrame(
+        {
+            "date": pd.to_datetime(df[date_col]),
+            "symbol": df.Currency.map(RENAMES).fillna(df.Currency),
+            "amount": df.Amount,
+            "price": value / df.Amount.abs(),
+        }
+    )
+    return txs.sort_values("date", kind="stable", ignore_index=True)
+
+
 if __name__ == "__main__":
     scrape_nexo_csv()
@@ -1,8 +1,10 @@
 from functools import lru_cache
 
-import requests
 from web3 import HTTPProvider, Web3
 
+from net_worth_tracker import http_client
+from net_worth_tracker.cache import DAY, disk_cache
+
 RPCS = {
     "fantom": "https://rpc.ftm.tools",
 }
@@ -10,9 +12,9 @@ RPCS = {
 GITHUB_RAW = "https://raw.githubusercontent.com/yearn/yearn-finance-v3/d3c24208191f17df5e98df0f946fc284c803aacb/"
 
 
-@lru_cache
+@disk_cache(ttl=30 * DAY)  # of a pinned commit
 def get_abi():
-    r = requests.get(f"{GITHUB_RAW}/src/core/services/contracts/vault.json")
+    r = http_client.get(f"{GITHUB_RAW}/src/core/services/contracts/vault.json")
     return r.json()
 
 
@@ -1,6 +1,7 @@
 import getpass
 import json
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from functools import cached_property, lru_cache
 from pathlib import Path
 from typing import Optional
@@ -8,7 +9,7 @@ from typing import Optional
 import requests
 import yfinance as yf
 
-from .utils import fname_from_date, get_password
+from .utils import fname_from_date, get_password, read_json
 
 FOLDER = Path(__file__).parent.parent / "degiro_data"
 
@@ -24,7 +25,6 @@ class DeGiro:
         password: Optional[str] = None,
         with_2fa: bool = False,
     ):
-
         if username is None:
             username = get_password("username", "degiro")
         if password is None:
@@ -164,24 +164,27 @@ class DeGiro:
 
 def load_latest_data(folder=FOLDER):
     last_file = sorted(folder.glob("*.json"))[-1]
-    with last_file.open("r") as f:
-        return json.load(f)
+    return read_json(last_file)
+
+
+def _latest_price(ticker):
+    if ticker == "EUR":
+        return 1
+    for ext in [".AS", ".DE", ""]:
+        # Try AMS exchange, then German, then anything.
+        t = yf.Ticker(ticker + ext)
+        if t.info.get("regularMarketPrice") is not None:
+            assert t.info["currency"] == "EUR"
+            return t.info["regularMarketPrice"]
+    return None
 
 
 def get_latest_prices(tickers):
-    price = {}
-    for ticker in tickers:
-        if ticker == "EUR":
-            price[ticker] = 1
-            continue
-        for ext in [".AS", ".DE", ""]:
-            # Try AMS exchange, then German, then anything.
-            t = yf.Ticker(ticker + ext)
-            if t.info.get("regularMarketPrice") is not None:
-                assert t.info["currency"] == "EUR"
-                price[ticker] = t.info["regularMarketPrice"]
-                break
-    return price
+    # Every ticker is a separate request, so look them up concurrently
+    tickers = list(tickers)
+    with ThreadPoolExecutor() as ex:
+        prices = dict(zip(tickers, ex.map(_latest_price, tickers)))
+    return {ticker: price for ticker, price in prices.items() if price is not None}
 
 
 @lru_cache
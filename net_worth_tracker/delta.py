@@ -0,0 +1,191 @@
+"""Delta-encoded snapshots.
+
+Instead of writing the full ``balances`` every run, `save_data` writes a full
+``keyframe.<date>.json`` every ``keyframe_every`` writes and otherwise only a
+``delta.<date>.json`` with the ``(where, symbol)`` entries whose amount changed
+since the previous snapshot and the new price of every symbol whose price
+changed, once per symbol instead of per entry. Nothing is written when nothing
+changed.
+
+Reconstructing a snapshot reads the last keyframe before it plus the deltas in
+between, so ``keyframe_every`` trades write size for read cost.
+"""
+from __future__ import annotations
+
+import datetime
+import json
+from pathlib import Path
+
+from net_worth_tracker import snapshot_index
+from net_worth_tracker.utils import _read_json, fname_from_date
+
+KEYFRAME = "keyframe."
+DELTA = "delta."
+
+
+def _files(
+    folder,
+    start: datetime.datetime | None = None,
+    end: datetime.datetime | None = None,
+) -> list[tuple[datetime.datetime, Path, bool]]:
+    """``(date, fname, is_keyframe)`` of the files needed to reconstruct
+    the snapshots in ``[start, end]``, sorted by date."""
+    keyframes = snapshot_index.query(folder, KEYFRAME, ".json", end=end)
+    if start is not None:
+        before = [dt for dt in keyframes if dt <= start]
+        if before:
+            start = before[-1]
+    files = [
+        (dt, fname, True)
+        for dt, fname in keyframes.items()
+        if start is None or dt >= start
+    ]
+    deltas = snapshot_index.query(folder, DELTA, ".json", start=start, end=end)
+    files.extend((dt, fname, False) for dt, fname in deltas.items())
+    return sorted(files, key=lambda x: x[0])
+
+
+def _prices(balances: dict) -> dict[str, float]:
+    """The price of every symbol whose entries all have that ``price`` and a
+    ``value`` of exactly ``amount * price``, such that a delta can store the
+    price once instead of the ``price`` and ``value`` of every entry."""
+    prices: dict[str, float] = {}
+    other = set()
+    for bals in balances.values():
+        for symbol, info in bals.items():
+            price = info.get("price")
+            if (
+                price is None
+                or info.get("value") != info["amount"] * price
+                or prices.setdefault(symbol, price) != price
+            ):
+                other.add(symbol)
+    return {symbol: p for symbol, p in prices.items() if symbol not in other}
+
+
+def _without_price(info: dict) -> dict:
+    return {k: v for k, v in info.items() if k not in ("price", "value")}
+
+
+def diff(old: dict, new: dict) -> dict:
+    """The delta that turns the ``old`` balances into the ``new`` balances.
+
+    The amounts are compared separately from the prices: an entry is only in
+    ``changed`` if its amount (or another field) changed, and the new price of
+    a symbol is in ``prices`` once, see `apply`.
+    """
+    prices = _prices(new)
+    changed = {}
+    removed = {}
+    changed_prices = {}
+    for where, bals in new.items():
+        old_bals = old.get(where, {})
+        entries = {}
+        for symbol, info in bals.items():
+            old_info = old_bals.get(symbol)
+            if symbol in prices:
+                if old_info is None or _without_price(old_info) != _without_price(info):
+                    entries[symbol] = _without_price(info)
+                    changed_prices[symbol] = prices[symbol]
+                elif old_info != info:  # only the price changed
+                    changed_prices[symbol] = prices[symbol]
+            elif old_info != info:
+                entries[symbol] = info
+        if entries:
+            changed[where] = entries
+        if where in old and (gone := [k for k in old_bals if k not in bals]):
+            removed[where] = gone
+    removed_wheres = [where for where in old if where not in new]
+    return dict(
+        changed=changed,
+        removed=removed,
+        removed_wheres=removed_wheres,
+        prices=changed_prices,
+    )
+
+
+def apply(balances: dict, delta: dict) -> dict:
+    """Return a copy of ``balances`` with ``delta`` applied.
+
+    Every entry of a symbol in ``delta["prices"]`` gets that ``price`` and a
+    ``value`` of ``amount * price``.
+    """
+    balances = {where: dict(bals) for where, bals in balances.items()}
+    for where in delta["removed_wheres"]:
+        del balances[where]
+    for where, symbols in delta["removed"].items():
+        for symbol in symbols:
+            del balances[where][symbol]
+    for where, entries in delta["changed"].items():
+        balances.setdefault(where, {}).update(entries)
+    prices = delta.get("prices", {})  # not in the deltas of older versions
+    for bals in balances.values():
+        for symbol in prices.keys() & bals.keys():
+            price = prices[symbol]
+            info = bals[symbol]
+            bals[symbol] = dict(info, price=price, value=info["amount"] * price)
+    return balances
+
+
+def _replay(files):
+    balances = None
+    for dt, fname, is_keyframe in files:
+        data = _read_json(fname)
+        if is_keyframe:
+            balances = data["balances"]
+        elif balances is not None:
+            balances = apply(balances, data)
+        if balances is not None:
+            yield dt, balances
+
+
+def load_data(
+    folder=Path("data"),
+    ndays: int | None = 365,
+) -> dict[datetime.datetime, dict]:
+    """Reconstruct the snapshots of the last ``ndays`` days, in the
+    same ``{date: data}`` shape as `net_worth_tracker.utils.load_data`."""
+    start = None
+    if ndays is not None:
+        start = datetime.datetime.today() - datetime.timedelta(days=ndays)
+    return {
+        dt: {"balances": balances}
+        for dt, balances in _replay(_files(folder, start))
+        if start is None or dt >= start
+    }
+
+
+def snapshot_at(folder, date: datetime.datetime) -> tuple[datetime.datetime, dict]:
+    """The ``(date, balances)`` of the last snapshot at or before ``date``."""
+    snapshots = list(_replay(_files(folder, date, date)))
+    if not snapshots:
+        raise ValueError(f"No snapshot at or before {date} in {folder}.")
+    return snapshots[-1]
+
+
+def save_data(
+    balances: dict,
+    folder=Path("data"),
+    keyframe_every: int = 24,
+    date: datetime.datetime | None = None,
+) -> Path | None:
+    """Write a delta (or a keyframe every ``keyframe_every`` writes) and return
+    its filename, or return None if nothing changed since the previous snapshot."""
+    if date is None:
+        date = datetime.datetime.now()
+    files = _files(folder, date, date)
+    if files:
+        *_, (_, previous) = _replay(files)
+        delta = diff(previous, balances)
+        if not any(delta.values()):
+            return None
+    if files and len(files) < keyframe_every:
+        fname = fname_from_date(folder, date, prefix=DELTA)
+        data = delta
+    else:
+        fname = fname_from_date(folder, date, prefix=KEYFRAME)
+        data = dict(balances=balances)
+    with fname.open("w") as f:
+        json.dump(data, f, indent="  ")
+    snapshot_index.add(fname)
+    return fname
@@ -0,0 +1,150 @@
+"""Fetch the balances of all sources concurrently.
+
+Every `Source` runs in its own thread, so the wall time is that of the
+slowest source instead of the sum of all of them. A source that does not
+finish within its ``timeout`` (counted from its own start) is reported as
+timed out and its result is discarded. Python threads cannot be killed, so
+it is abandoned rather than stopped: it runs in a daemon thread, which does
+not keep the interpreter from exiting.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable
+
+import pandas as pd
+
+from net_worth_tracker import brand_new_day, degiro, manual
+from net_worth_tracker.crypto import binance, coin_gecko, exodus, nexo
+
+
+@dataclass
+class Source:
+    name: str
+    fetch: Callable[[], dict]
+    timeout: float = 120
+    # The result is ``{where: balances}`` (like `manual.load`) instead of
+    # the balances of ``name``
+    merge: bool = False
+
+
+@dataclass
+class SourceStatus:
+    name: str
+    ok: bool
+    seconds: float
+    error: str | None = None
+
+
+def _brand_new_day() -> dict:
+    return brand_new_day.get_bnd_balances(brand_new_day.scrape_brand_new_day())
+
+
+SOURCES: dict[str, Source] = {}
+
+
+def register(
+    name: str, fetch: Callable[[], dict], timeout: float = 120, merge: bool = False
+) -> None:
+    """Register (or replace) a source that `fetch_all` fetches by default."""
+    SOURCES[name] = Source(name, fetch, timeout, merge)
+
+
+register("binance", binance.get_binance_balances)
+register("nexo", nexo.get_nexo_balances)
+register("exodus", exodus.get_exodus)
+register("degiro", degiro.get_degiro_balances)
+register("brand_new_day", _brand_new_day, timeout=300)  # Selenium login
+register("manual", manual.load, merge=True)
+
+
+def _run(i: int, source: Source, finished: queue.Queue) -> None:
+    t_start = time.monotonic()
+    try:
+        result = source.fetch()
+    except Exception as e:
+        finished.put((i, None, e, time.monotonic() - t_start))
+    else:
+        finished.put((i, result, None, time.monotonic() - t_start))
+
+
+def fetch_all(
+    sources: list[Source] | None = None,
+    max_workers: int | None = None,
+    on_result: Callable[[str, dict], None] | None = None,
+) -> tuple[dict, list[SourceStatus]]:
+    """Fetch all ``sources`` (default: the registered ones) concurrently.
+
+    Returns the combined ``balances`` dict and the `SourceStatus` of every
+    source. ``on_result(where, balances)`` is called (from the calling thread)
+    as soon as a source finished, e.g., to start pricing its symbols. At most
+    ``max_workers`` sources are fetched at once; a source that timed out no
+    longer counts.
+    """
+    if sources is None:
+        sources = list(SOURCES.values())
+    balances: dict = {}
+    statuses: list[SourceStatus] = []
+    finished: queue.Queue = queue.Queue()
+    todo = deque(enumerate(sources))
+    running: dict[int, float] = {}  # the start time per source
+    while todo or running:
+        while todo and len(running) < (max_workers or len(sources)):
+            i, source = todo.popleft()
+            running[i] = time.monotonic()
+            threading.Thread(
+                target=_run,
+                args=(i, source, finished),
+                name=f"fetch-{source.name}",
+                daemon=True,
+            ).start()
+        deadline = min(t + sources[i].timeout for i, t in running.items())
+        try:
+            i, result, error, seconds = finished.get(
+                timeout=max(deadline - time.monotonic(), 0)
+            )
+        except queue.Empty:
+            pass
+        else:
+            source = sources[i]
+            if running.pop(i, None) is None:
+                pass  # it finished after it timed out
+            elif error is not None:
+                statuses.append(SourceStatus(source.name, False, seconds, repr(error)))
+            else:
+                results = result if source.merge else {source.name: result}
+                balances.update(results)
+                statuses.append(SourceStatus(source.name, True, seconds))
+                if on_result is not None:
+                    for where, bals in results.items():
+                        on_result(where, bals)
+        now = time.monotonic()
+        for i, t in list(running.items()):
+            if now - t >= sources[i].timeout:
+                del running[i]
+                statuses.append(
+                    SourceStatus(sources[i].name, False, now - t, "timeout")
+                )
+    return balances, statuses
+
+
+def fetch_and_price(
+    sources: list[Source] | None = None,
+    max_workers: int | None = None,
+) -> tuple[dict, list[SourceStatus]]:
+    """`fetch_all` and `coin_gecko.add_value_and_price`, where the prices of
+    each source are requested as soon as its balances are in."""
+    pricer = coin_gecko.Pricer()
+    balances, statuses = fetch_all(sources, max_workers, on_result=pricer.add)
+    pricer.add_value_and_price(balances)
+    return balances, statuses
+
+
+def report(statuses: list[SourceStatus]) -> pd.DataFrame:
+    """The statuses as a DataFrame, slowest first."""
+    df = pd.DataFrame(statuses).set_index("name")
+    return df.sort_values("seconds", ascending=False)
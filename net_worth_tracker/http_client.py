@@ -0,0 +1,118 @@
+"""A shared HTTP client for all REST calls.
+
+One client is used for the whole process, so connections are kept alive and
+reused instead of doing a TCP and TLS handshake per request. If ``httpx``
+and ``h2`` are installed, requests are made over HTTP/2, otherwise with a
+pooled `requests.Session`. `get` retries connection errors, timeouts, 429
+and 5xx responses with exponential backoff and full jitter (or after the
+``Retry-After`` that the server asked for), and limits the number of
+concurrent requests per host to ``MAX_PER_HOST``, such that the concurrently
+fetched sources (see `net_worth_tracker.fetch`) do not hammer one API.
+"""
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import h2  # noqa: F401, needed for httpx' HTTP/2 support
+    import httpx
+except ImportError:
+    httpx = None
+
+TIMEOUT = 30  # seconds
+RETRIES = 4
+BACKOFF = 0.5  # seconds, doubled after every attempt
+MAX_BACKOFF = 30  # seconds
+MAX_PER_HOST = 4
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+
+_TRANSIENT: tuple[type[Exception], ...] = (
+    requests.ConnectionError,
+    requests.Timeout,
+)
+if httpx is not None:
+    _TRANSIENT += (httpx.TransportError,)
+
+_LOCK = threading.Lock()
+_CLIENT = None
+_HOST_LIMITS: defaultdict[str, threading.BoundedSemaphore] = defaultdict(
+    lambda: threading.BoundedSemaphore(MAX_PER_HOST)
+)
+
+
+def _new_client():
+    if httpx is not None:
+        limits = httpx.Limits(max_keepalive_connections=4 * MAX_PER_HOST)
+        return httpx.Client(http2=True, limits=limits, follow_redirects=True)
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=MAX_PER_HOST)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def client():
+    """The process-wide ``httpx.Client`` or `requests.Session`."""
+    global _CLIENT
+    with _LOCK:
+        if _CLIENT is None:
+            _CLIENT = _new_client()
+        return _CLIENT
+
+
+def _host_limit(url: str) -> threading.BoundedSemaphore:
+    with _LOCK:
+        return _HOST_LIMITS[urlsplit(url).netloc]
+
+
+def _backoff(attempt: int, response=None) -> float:
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after is not None and retry_after.isdigit():
+        return min(float(retry_after), MAX_BACKOFF)
+    return random.uniform(0, min(BACKOFF * 2**attempt, MAX_BACKOFF))
+
+
+def get(
+    url: str,
+    retries: int = RETRIES,
+    ok: Callable[[Any], bool] | None = None,
+    **kwargs,
+):
+    """GET ``url`` with the shared `client`, retrying transient failures.
+
+    A response for which ``ok(response)`` is False or raises (e.g., an API
+    that returns an error payload with status 200, or an HTML error page
+    that ``r.json()`` fails on) is retried as well. Raises the last error,
+    or a `RuntimeError`, after ``retries`` retries.
+    """
+    kwargs.setdefault("timeout", TIMEOUT)
+    for attempt in range(retries + 1):
+        response = None
+        try:
+            with _host_limit(url):
+                response = client().get(url, **kwargs)
+        except _TRANSIENT:
+            if attempt == retries:
+                raise
+        else:
+            try:
+                if response.status_code not in RETRY_STATUS and (
+                    ok is None or ok(response)
+                ):
+                    return response
+            except Exception:
+                if attempt == retries:
+                    raise
+        if attempt < retries:
+            time.sleep(_backoff(attempt, response))
+    raise RuntimeError(
+        f"GET {url} failed {retries + 1} times, last status: {response.status_code}"
+    )
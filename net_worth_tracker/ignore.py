@@ -27,3 +27,10 @@ ignore_symbols = (
     "VERA",
     "XEC",
 )
+
+# The wallets that the crypto report (crypto-tracker.ipynb) leaves out
+ignore_wallets = (
+    "degiro",
+    "brand_new_day",
+    "stock_manual",
+)
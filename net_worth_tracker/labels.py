@@ -0,0 +1,88 @@
+"""Compact dtypes for the frames of `net_worth_tracker.utils`.
+
+The ``symbol`` and ``where`` labels are stored as categoricals whose categories
+come from a persisted, append-only intern table (``<folder>/labels.json``).
+Every frame therefore shares the same categories, so the codes are stable
+across runs, concatenated frames stay categorical, and groupbys on the labels
+operate on integer codes. The ``date`` column stays ``datetime64`` because the
+lookups in `utils.overview_df` do a binary search on it.
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+FNAME = "labels.json"
+LABEL_COLUMNS = ("symbol", "where")
+
+
+def load(folder=Path("data")) -> dict[str, list[str]]:
+    """The interned labels per column, in the order they were added."""
+    fname = Path(folder) / FNAME
+    if not fname.exists():
+        return {col: [] for col in LABEL_COLUMNS}
+    with fname.open() as f:
+        labels = json.load(f)
+    return {col: labels.get(col, []) for col in LABEL_COLUMNS}
+
+
+def _save(labels: dict[str, list[str]], folder) -> None:
+    fname = Path(folder) / FNAME
+    tmp = fname.with_suffix(".tmp")
+    with tmp.open("w") as f:
+        json.dump(labels, f, indent="  ")
+    tmp.replace(fname)
+
+
+def intern(
+    values: dict[str, pd.Series], folder=Path("data")
+) -> dict[str, pd.CategoricalDtype]:
+    """Add the new labels in ``values`` (``{column: values}``) to the intern
+    table and return the ``CategoricalDtype`` of every column."""
+    labels = load(folder)
+    changed = False
+    for col, vals in values.items():
+        known = set(labels[col])
+        new = [v for v in pd.unique(vals) if v not in known]
+        if new:
+            labels[col].extend(new)
+            changed = True
+    if changed:
+        _save(labels, folder)
+    return {col: pd.CategoricalDtype(labels[col]) for col in values}
+
+
+def memory_usage(df: pd.DataFrame) -> int:
+    """The memory used by ``df`` in bytes, including Python string objects."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def compact(
+    df: pd.DataFrame,
+    folder=Path("data"),
+    float32: bool = False,
+    report: bool = False,
+) -> pd.DataFrame:
+    """Return ``df`` with ``symbol`` and ``where`` as interned categoricals and,
+    with ``float32=True``, the float columns downcast to ``float32``.
+
+    Works on the frame of `utils.datas_to_df` and on the table of
+    `utils.long_to_attribution`. With ``report=True`` the memory usage
+    before and after is printed.
+    """
+    cols = [col for col in LABEL_COLUMNS if col in df.columns]
+    dtypes = intern({col: df[col] for col in cols}, folder)
+    if float32:
+        floats = df.select_dtypes(include=[np.float64]).columns
+        dtypes.update({col: np.float32 for col in floats})
+    compacted = df.astype(dtypes)
+    if report:
+        before, after = memory_usage(df), memory_usage(compacted)
+        print(
+            f"Memory usage: {before / 1e6:.2f} MB → {after / 1e6:.2f} MB"
+            f" ({100 * after / before:.0f}%)"
+        )
+    return compacted
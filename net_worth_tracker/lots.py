@@ -0,0 +1,168 @@
+"""Lot-based cost basis and realized/unrealized gains from transaction histories.
+
+Transactions are a ``(date, symbol, amount, price)`` table with a signed
+``amount`` (positive for acquisitions, negative for disposals) and the
+``price`` per unit (NaN if unknown, see `fill_prices`). The adapters
+`crypto.exodus.get_exodus_transactions`,
+`crypto.nexo.get_nexo_transactions_from_csv` and
+`crypto.binance_smart_chain.get_bep20_transactions` return this table.
+
+`ledger` computes, for every transaction, the running ``quantity``, the
+``cost_basis`` of the remaining lots and the ``realized`` gain, with FIFO or
+average cost, with array operations per symbol instead of a Python loop over
+transactions.
+`override_avg_price` uses it to replace the snapshot-difference approximation
+of `utils.add_avg_price`.
+"""
+from __future__ import annotations
+
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+
+from net_worth_tracker.utils import RENAMES
+
+TX_COLUMNS = ["date", "symbol", "amount", "price"]
+
+
+def combine(*txs: pd.DataFrame, renames=RENAMES) -> pd.DataFrame:
+    """Concatenate transaction tables, rename the symbols like
+    `utils.datas_to_df` does, and sort them by ``(symbol, date)``."""
+    df = pd.concat([tx[TX_COLUMNS] for tx in txs], ignore_index=True)
+    df["symbol"] = df.symbol.map(renames).fillna(df.symbol)
+    return df.sort_values(["symbol", "date"], kind="stable", ignore_index=True)
+
+
+def _asof(left: pd.DataFrame, right: pd.DataFrame, column: str) -> np.ndarray:
+    """The last ``column`` of ``right`` at or before each ``(date, symbol)``
+    of ``left``, in the order of ``left``."""
+    left = left[["date", "symbol"]].astype({"symbol": object})
+    left = left.assign(position=np.arange(len(left)))
+    right = right[["date", "symbol", column]].astype({"symbol": object})
+    merged = pd.merge_asof(
+        left.sort_values("date", kind="stable"),
+        right.sort_values("date", kind="stable"),
+        on="date",
+        by="symbol",
+    )
+    return merged.sort_values("position")[column].to_numpy()
+
+
+def fill_prices(txs: pd.DataFrame, df: pd.DataFrame) -> pd.DataFrame:
+    """Fill the missing prices of ``txs`` with the last ``price`` in ``df``
+    (the frame of `utils.datas_to_df`) at or before the transaction date."""
+    prices = _asof(txs, df.dropna(subset=["price"]), "price")
+    txs = txs.copy()
+    txs["price"] = txs.price.fillna(pd.Series(prices, txs.index))
+    return txs
+
+
+def _groups(start: np.ndarray) -> list[slice]:
+    """The slices of the consecutive groups that begin at every ``start``."""
+    (i,) = np.nonzero(start)
+    return [slice(lo, hi) for lo, hi in zip(i, np.r_[i[1:], len(start)])]
+
+
+def _group_cumsum(x: np.ndarray, start: np.ndarray) -> np.ndarray:
+    """Cumulative sum of ``x`` restarting at every ``start``."""
+    out = np.empty(len(x))
+    for group in _groups(start):
+        out[group] = np.cumsum(x[group])
+    return out
+
+
+def _fifo(buy_q, buy_cost, sell_q, start):
+    """Cost basis of the remaining lots after every transaction, FIFO."""
+    # The cumulative cost as a function of the cumulative bought quantity is
+    # piecewise linear; the lots sold first are those at the lowest quantities.
+    bought = _group_cumsum(buy_q, start)
+    bought_cost = _group_cumsum(buy_cost, start)
+    # Selling more than was bought (e.g., a missing history) costs nothing
+    sold = np.minimum(_group_cumsum(sell_q, start), bought)
+    sold_cost = np.empty(len(sold))
+    for group in _groups(start):
+        xp = np.r_[0.0, bought[group]]
+        fp = np.r_[0.0, bought_cost[group]]
+        sold_cost[group] = np.interp(sold[group], xp, fp)
+    return bought_cost - sold_cost
+
+
+def _average(amount, buy_cost, start):
+    """Cost basis of the holdings after every transaction, average cost."""
+    q_after = _group_cumsum(amount, start)
+    q_before = q_after - amount
+    # A disposal scales the cost basis by the fraction of the holdings that
+    # is left, so ``cost[t] = a[t] * cost[t-1] + buy_cost[t]``.
+    sell = amount < 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        a = np.where(sell & (q_before > 0), np.maximum(q_after, 0) / q_before, 1.0)
+    a = np.where(sell & (q_before <= 0), 0.0, a)
+    # Holdings that are fully disposed of start a new segment, in which the
+    # recurrence is solved with cumulative products: cost = P * cumsum(b / P)
+    new_segment = start | (a == 0)
+    log_p = _group_cumsum(np.log(np.where(a == 0, 1.0, a)), new_segment)
+    p = np.exp(log_p)
+    return p * _group_cumsum(buy_cost / p, new_segment)
+
+
+def ledger(
+    txs: pd.DataFrame, method: Literal["fifo", "average"] = "fifo"
+) -> pd.DataFrame:
+    """The transactions, sorted by ``(symbol, date)``, with the running
+    ``quantity``, ``cost_basis``, ``avg_cost`` and the ``realized`` gain.
+
+    Acquisitions without a price enter at zero cost (e.g., interest); call
+    `fill_prices` first to value them at the market price. The ``realized``
+    gain of a disposal without a price is NaN.
+    """
+    if method not in ("fifo", "average"):
+        raise ValueError("`method` must be 'fifo' or 'average'.")
+    txs = txs.sort_values(["symbol", "date"], kind="stable", ignore_index=True)
+    symbol = txs.symbol.to_numpy()
+    amount = txs.amount.to_numpy(dtype=float)
+    price = txs.price.to_numpy(dtype=float)
+    start = np.r_[True, symbol[1:] != symbol[:-1]] if len(txs) else np.r_[()]
+    start = start.astype(bool)
+    buy_q = np.maximum(amount, 0.0)
+    sell_q = np.maximum(-amount, 0.0)
+    buy_cost = np.nan_to_num(buy_q * price)
+
+    if method == "fifo":
+        cost = _fifo(buy_q, buy_cost, sell_q, start)
+    else:
+        cost = _average(amount, buy_cost, start)
+    quantity = _group_cumsum(amount, start)
+    cost_before = np.where(start, 0.0, np.r_[0.0, cost[:-1]])
+    disposed = cost_before + buy_cost - cost
+    realized = np.where(sell_q > 0, sell_q * price - disposed, 0.0)
+
+    txs["quantity"] = quantity
+    txs["cost_basis"] = cost
+    with np.errstate(divide="ignore", invalid="ignore"):
+        txs["avg_cost"] = np.where(quantity > 0, cost / quantity, np.nan)
+    txs["realized"] = realized
+    return txs
+
+
+def summary(ledger: pd.DataFrame, prices: pd.Series | None = None) -> pd.DataFrame:
+    """Per symbol the ``quantity``, ``cost_basis``, ``avg_cost`` and ``realized``
+    gain of a `ledger` and, given the current ``prices`` (indexed by
+    symbol), the ``value`` and ``unrealized`` gain."""
+    last = ledger.drop_duplicates("symbol", keep="last").set_index("symbol")
+    result = last[["quantity", "cost_basis", "avg_cost"]].sort_index()
+    realized = ledger.groupby("symbol", observed=True).realized.sum(min_count=1)
+    result["realized"] = realized
+    if prices is not None:
+        result["value"] = result.quantity * prices.reindex(result.index)
+        result["unrealized"] = result.value - result.cost_basis
+    return result
+
+
+def override_avg_price(df: pd.DataFrame, ledger: pd.DataFrame) -> pd.DataFrame:
+    """Return ``df`` (the frame of `utils.datas_to_df`) with the ``avg_price``
+    replaced by the ``avg_cost`` of the ``ledger`` at each date, where known."""
+    avg_cost = pd.Series(_asof(df, ledger, "avg_cost"), df.index)
+    df = df.copy()
+    df["avg_price"] = avg_cost.where(avg_cost.notna(), df.avg_price)
+    return df
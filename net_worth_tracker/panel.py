@@ -0,0 +1,130 @@
+"""Dense dates × symbols panel of the long-format frame of `utils.datas_to_df`.
+
+Most views of the data (totals per date, value per wallet, the history of a
+single coin, the holdings at a date) are pivots of the long frame. A `Panel`
+builds these pivots once as NumPy arrays, so every view is an array slice.
+The functions that use it take an optional ``panel`` argument, so a caller
+that makes many views of the same frame builds it once with `Panel.from_df`
+and passes it along.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+FIELDS = ("amount", "price", "value", "avg_price")
+
+
+@dataclass
+class Panel:
+    dates: pd.DatetimeIndex
+    symbols: pd.Index
+    wallets: pd.Index
+    # dates × symbols, NaN where a symbol is not held (or has no price)
+    fields: dict[str, np.ndarray] = field(repr=False)
+    # dates × wallets, the summed ``value_in_<wallet>`` columns (or attribution)
+    wallet_value: np.ndarray = field(repr=False)
+
+    @classmethod
+    def from_df(
+        cls, df: pd.DataFrame, attribution: pd.DataFrame | None = None
+    ) -> Panel:
+        """Build the panel of ``df``; the value per wallet is taken from
+        ``attribution`` (see `utils.long_to_attribution`) if it is passed and
+        from the ``value_in_*`` columns of ``df`` otherwise."""
+        date_code, dates = pd.factorize(df.date, sort=True)
+        # Sorted by name, also for categoricals (whose order is the interning order)
+        symbol_code, symbols = pd.factorize(np.asarray(df.symbol), sort=True)
+        shape = (len(dates), len(symbols))
+        fields = {}
+        for name in FIELDS:
+            if name in df.columns:
+                arr = np.full(shape, np.nan)
+                arr[date_code, symbol_code] = df[name].to_numpy(dtype=float)
+                fields[name] = arr
+        if attribution is not None:
+            i = dates.get_indexer(attribution.date)
+            where_code, wallets = pd.factorize(attribution["where"])
+            wallet_value = np.zeros((len(dates), len(wallets)))
+            np.add.at(wallet_value, (i, where_code), attribution.value.to_numpy())
+        else:
+            cols = [c for c in df.columns if c.startswith("value_in_")]
+            wallet_value = np.zeros((len(dates), len(cols)))
+            for j, col in enumerate(cols):
+                weights = np.nan_to_num(df[col].to_numpy(dtype=float))
+                wallet_value[:, j] = np.bincount(date_code, weights, len(dates))
+            wallets = [c.replace("value_in_", "", 1) for c in cols]
+        return cls(
+            pd.DatetimeIndex(dates),
+            pd.Index(symbols),
+            pd.Index(wallets),
+            fields,
+            wallet_value,
+        )
+
+    @property
+    def amount(self) -> np.ndarray:
+        return self.fields["amount"]
+
+    @property
+    def price(self) -> np.ndarray:
+        return self.fields["price"]
+
+    @property
+    def value(self) -> np.ndarray:
+        return self.fields["value"]
+
+    def frame(self, name: str = "value") -> pd.DataFrame:
+        """A dates × symbols DataFrame of ``amount``, ``price``, ``value`` or ``avg_price``."""
+        return pd.DataFrame(self.fields[name], self.dates, self.symbols)
+
+    def total(self) -> pd.Series:
+        """Total value per date."""
+        return pd.Series(np.nansum(self.value, axis=1), self.dates, name="total")
+
+    def wallet_values(self) -> pd.DataFrame:
+        """Total value per wallet (``where``) per date."""
+        return pd.DataFrame(self.wallet_value, self.dates, self.wallets)
+
+    def at(self, date) -> pd.DataFrame:
+        """The holdings at ``date`` (which must be one of `dates`), indexed by symbol."""
+        (i,) = self.dates.get_indexer([date])
+        if i == -1:
+            return pd.DataFrame(columns=list(self.fields), index=self.symbols[:0])
+        rows = pd.DataFrame(
+            {name: arr[i] for name, arr in self.fields.items()}, index=self.symbols
+        )
+        return rows[~np.isnan(rows.amount.to_numpy())]
+
+    def last_per_day(self) -> list[pd.Timestamp]:
+        """The last date of every day."""
+        dates = self.dates.to_series()
+        return list(dates.groupby(self.dates.normalize()).last())
+
+    def asof(self, grid) -> Panel:
+        """The panel at the times of ``grid``, using the last snapshot at or
+        before each time (NaN before the first snapshot)."""
+        grid = pd.DatetimeIndex(grid)
+        i = np.searchsorted(self.dates.to_numpy(), grid.to_numpy(), "right") - 1
+        valid = i >= 0
+        i = np.where(valid, i, 0)
+
+        def take(arr):
+            out = arr[i].astype(float)
+            out[~valid] = np.nan
+            return out
+
+        return Panel(
+            grid,
+            self.symbols,
+            self.wallets,
+            {name: take(arr) for name, arr in self.fields.items()},
+            take(self.wallet_value),
+        )
+
+    def resample(self, freq: str = "1D") -> Panel:
+        """The panel on a regular grid from the first to the last date, see `asof`."""
+        grid = pd.date_range(self.dates[0], self.dates[-1], freq=freq)
+        return self.asof(grid)
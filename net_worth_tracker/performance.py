@@ -0,0 +1,393 @@
+"""Rolling performance analytics of every symbol and of the total net worth.
+
+The frame of `utils.datas_to_df` is sampled on a regular grid (see
+`panel.Panel.resample`) as a dates × columns frame with the ``price`` of every
+symbol and the ``total`` value. On that grid the returns over several windows,
+the annualized volatility, and the drawdowns are computed for all columns at
+once. `Tracker` keeps only the last window of the grid, the drawdown state, and
+the last snapshot, so new snapshots are processed without recomputing (or
+reading) the history; it is saved next to the snapshots between runs.
+
+`cash_flows` separates the inflows (buying or depositing more) from the market
+moves, per symbol, per wallet, or in total, for the time-weighted and
+money-weighted (Modified Dietz and IRR) returns of `return_summary`.
+"""
+from __future__ import annotations
+
+import pickle
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from net_worth_tracker.cache import cache_key
+from net_worth_tracker.panel import Panel
+
+DEFAULT_WINDOWS = ("1D", "7D", "30D", "365D")
+TOTAL = "total"
+
+
+def _grid_frame(panel, grid) -> pd.DataFrame:
+    sampled = panel.asof(grid)
+    frame = sampled.frame("price")
+    frame[TOTAL] = sampled.total().where(~np.isnan(sampled.value).all(axis=1))
+    return frame
+
+
+def grid(
+    df: pd.DataFrame, freq: str = "1D", panel: Panel | None = None
+) -> pd.DataFrame:
+    """The ``price`` of every symbol and the ``total`` value on a regular grid;
+    pass the ``panel`` of ``df`` if it is built already."""
+    if panel is None:
+        panel = Panel.from_df(df)
+    return _grid_frame(panel, pd.date_range(panel.dates[0], panel.dates[-1], freq=freq))
+
+
+def _periods(window: str, freq: str) -> int:
+    return max(1, round(pd.Timedelta(window) / pd.Timedelta(freq)))
+
+
+def period_returns(series: pd.DataFrame, window: str, freq: str = "1D") -> pd.DataFrame:
+    """The return over ``window`` at every date of a regular ``series``."""
+    return series / series.shift(_periods(window, freq)) - 1
+
+
+def annualized_volatility(
+    series: pd.DataFrame, window: str = "30D", freq: str = "1D"
+) -> pd.DataFrame:
+    """The rolling standard deviation of the log returns over ``window``,
+    annualized with 365 periods of a day per year."""
+    log_returns = np.log(series / series.shift(1))
+    per_year = pd.Timedelta("365D") / pd.Timedelta(freq)
+    n = _periods(window, freq)
+    return log_returns.rolling(n, min_periods=2).std() * np.sqrt(per_year)
+
+
+@dataclass
+class DrawdownState:
+    """Per column the running ``peak``, the time of the peak, the maximum
+    drawdown, and the longest time spent below a peak (in days)."""
+
+    peak: np.ndarray
+    peak_time: np.ndarray
+    max_drawdown: np.ndarray
+    max_days: np.ndarray
+
+    @classmethod
+    def empty(cls, n: int) -> DrawdownState:
+        nan = np.full(n, np.nan)
+        return cls(nan, np.full(n, np.datetime64("NaT"), "M8[ns]"), nan, nan)
+
+    def reindex(self, n: int) -> DrawdownState:
+        """Extend the state with empty columns up to ``n`` columns."""
+        extra = DrawdownState.empty(n - len(self.peak))
+        return DrawdownState(
+            *(np.r_[getattr(self, f), getattr(extra, f)] for f in self.__annotations__)
+        )
+
+
+def _drawdown(values: np.ndarray, times: np.ndarray, state: DrawdownState):
+    """The drawdown and the days since the peak for every row of ``values``,
+    continuing from ``state``, and the updated state."""
+    peak = np.fmax.accumulate(np.vstack([state.peak, values]), axis=0)[1:]
+    n = len(values)
+    at_peak = values >= peak
+    i = np.maximum.accumulate(np.where(at_peak, np.arange(1, n + 1)[:, None], 0))
+    peak_time = np.where(i == 0, state.peak_time, times[i - 1])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        drawdown = values / peak - 1
+    days = (times[:, None] - peak_time) / np.timedelta64(1, "D")
+    days = np.where(np.isnan(values), np.nan, days)
+    if n:
+        state = DrawdownState(
+            peak[-1],
+            peak_time[-1],
+            np.fmin(state.max_drawdown, np.fmin.reduce(drawdown, axis=0)),
+            np.fmax(state.max_days, np.fmax.reduce(days, axis=0)),
+        )
+    return drawdown, days, state
+
+
+def drawdown(series: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """The drawdown from the running peak and the days since that peak."""
+    state = DrawdownState.empty(series.shape[1])
+    times = series.index.to_numpy(dtype="M8[ns]")
+    dd, days, _ = _drawdown(series.to_numpy(dtype=float), times, state)
+    return (
+        pd.DataFrame(dd, series.index, series.columns),
+        pd.DataFrame(days, series.index, series.columns),
+    )
+
+
+def _summary(
+    series: pd.DataFrame,
+    current_drawdown: np.ndarray,
+    state: DrawdownState,
+    windows,
+    vol_window: str,
+    freq: str,
+) -> pd.DataFrame:
+    last = {
+        f"{w} return (%)": 100 * period_returns(series, w, freq).iloc[-1]
+        for w in windows
+    }
+    vol = annualized_volatility(series, vol_window, freq).iloc[-1]
+    last[f"{vol_window} volatility (%)"] = 100 * vol
+    last["drawdown (%)"] = 100 * current_drawdown
+    last["max drawdown (%)"] = 100 * state.max_drawdown
+    last["max drawdown days"] = state.max_days
+    return pd.DataFrame(last, index=series.columns)
+
+
+def summary(
+    df: pd.DataFrame,
+    windows=DEFAULT_WINDOWS,
+    vol_window: str = "30D",
+    freq: str = "1D",
+) -> pd.DataFrame:
+    """Per symbol (by price) and for the ``total`` value the latest returns
+    over ``windows``, the annualized volatility, the current and maximum
+    drawdown, and the longest drawdown in days."""
+    series = grid(df, freq)
+    state = DrawdownState.empty(series.shape[1])
+    times = series.index.to_numpy(dtype="M8[ns]")
+    dd, _, state = _drawdown(series.to_numpy(dtype=float), times, state)
+    return _summary(series, dd[-1], state, windows, vol_window, freq)
+
+
+_TRACKER_COLUMNS = ["date", "symbol", "price", "value"]
+
+
+def _tracker_fname(folder, windows, vol_window: str, freq: str) -> Path:
+    key = cache_key(list(windows), vol_window, freq)
+    return Path(folder) / f"performance-{key}.pickle"
+
+
+@dataclass
+class Tracker:
+    """Incrementally updated `summary`.
+
+    Call `update` with the `utils.datas_to_df` rows of the new snapshots
+    (e.g., the result of `cost_basis.ingest`); only those and the rows of the
+    previous last snapshot are sampled, and only the last ``max(windows)`` of
+    the grid is kept. `save` and `load` persist the state next to the
+    snapshots, in ``<folder>/performance-<key>.pickle``.
+    """
+
+    windows: tuple = DEFAULT_WINDOWS
+    vol_window: str = "30D"
+    freq: str = "1D"
+    tail: pd.DataFrame | None = field(default=None, repr=False)
+    state: DrawdownState | None = field(default=None, repr=False)
+    current_drawdown: np.ndarray | None = field(default=None, repr=False)
+    # The rows of the last processed snapshot, to sample the grid points
+    # between it and the first new snapshot
+    last_rows: pd.DataFrame | None = field(default=None, repr=False)
+
+    def update(self, new_rows: pd.DataFrame) -> pd.DataFrame:
+        """Process the snapshots in ``new_rows`` that are newer than the last
+        processed one and return the summary."""
+        rows = new_rows[_TRACKER_COLUMNS]
+        if self.last_rows is not None:
+            rows = rows[rows.date > self.last_rows.date.iloc[0]]
+            rows = pd.concat([self.last_rows, rows], ignore_index=True)
+        panel = Panel.from_df(rows)
+        if self.tail is None:
+            start = panel.dates[0]
+        else:
+            start = self.tail.index[-1] + pd.Timedelta(self.freq)
+        new = _grid_frame(panel, pd.date_range(start, panel.dates[-1], freq=self.freq))
+        if self.tail is None:
+            columns = new.columns
+            self.state = DrawdownState.empty(len(columns))
+            self.current_drawdown = np.full(len(columns), np.nan)
+        else:
+            # New symbols are appended as new columns
+            columns = self.tail.columns.append(
+                new.columns.difference(self.tail.columns)
+            )
+            self.state = self.state.reindex(len(columns))
+            self.current_drawdown = np.r_[
+                self.current_drawdown,
+                np.full(len(columns) - len(self.current_drawdown), np.nan),
+            ]
+        new = new.reindex(columns=columns)
+        if len(new):
+            times = new.index.to_numpy(dtype="M8[ns]")
+            dd, _, self.state = _drawdown(new.to_numpy(dtype=float), times, self.state)
+            self.current_drawdown = dd[-1]
+        n = max(_periods(w, self.freq) for w in (*self.windows, self.vol_window))
+        tail = new if self.tail is None else pd.concat([self.tail, new])
+        self.tail = tail.reindex(columns=columns).iloc[-(n + 1) :]
+        self.last_rows = rows[rows.date == rows.date.max()].reset_index(drop=True)
+        return _summary(
+            self.tail,
+            self.current_drawdown,
+            self.state,
+            self.windows,
+            self.vol_window,
+            self.freq,
+        )
+
+    def save(self, folder=Path("data")) -> None:
+        """Persist the state in ``folder``, see `load`."""
+        fname = _tracker_fname(folder, self.windows, self.vol_window, self.freq)
+        tmp = fname.with_suffix(".tmp")
+        with tmp.open("wb") as f:
+            pickle.dump(self, f)
+        tmp.replace(fname)
+
+    @classmethod
+    def load(
+        cls,
+        folder=Path("data"),
+        windows=DEFAULT_WINDOWS,
+        vol_window: str = "30D",
+        freq: str = "1D",
+    ) -> Tracker:
+        """The `Tracker` with these settings that was saved in ``folder``,
+        or a new one if there is none."""
+        fname = _tracker_fname(folder, windows, vol_window, freq)
+        if not fname.exists():
+            return cls(tuple(windows), vol_window, freq)
+        with fname.open("rb") as f:
+            return pickle.load(f)
+
+
+def _ffill(arr: np.ndarray) -> np.ndarray:
+    return pd.DataFrame(arr).ffill().to_numpy()
+
+
+def cash_flows(
+    df: pd.DataFrame,
+    by: str = "symbol",
+    attribution: pd.DataFrame | None = None,
+    panel: Panel | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """The dates × entities ``value`` and net inflow (``flow``) per period.
+
+    The flow of a holding is its change in amount times the price at the
+    end of the period (the ``Δamount * price`` of `utils.add_avg_price`) and
+    the first value is the first inflow. Holdings without a price (e.g., one
+    that disappeared, so it was sold) are valued at their last price.
+    ``by`` is ``"symbol"``, ``"total"``, or ``"where"``, the latter needs
+    the ``attribution`` of `utils.long_to_attribution`. Pass the ``panel`` of
+    ``df`` if it is built already.
+    """
+    if panel is None:
+        panel = Panel.from_df(df)
+    price = _ffill(panel.price)
+    amount = np.nan_to_num(panel.amount)
+    if by == "where":
+        if attribution is None:
+            raise ValueError("`by='where'` requires the `attribution`.")
+        i = panel.dates.get_indexer(attribution.date)
+        j = panel.symbols.get_indexer(attribution.symbol)
+        pair, pairs = pd.MultiIndex.from_arrays([attribution["where"], j]).factorize()
+        holdings = np.zeros((len(panel.dates), len(pairs)))
+        holdings[i, pair] = attribution.ratio.to_numpy() * amount[i, j]
+        amount = holdings
+        price = price[:, pairs.get_level_values(1)]
+        labels = pairs.get_level_values(0)
+    elif by == "symbol":
+        labels = panel.symbols
+    elif by == "total":
+        labels = pd.Index([TOTAL] * len(panel.symbols))
+    else:
+        raise ValueError("`by` must be 'symbol', 'total', or 'where'.")
+
+    value = np.nan_to_num(amount * price)
+    Δamount = np.diff(amount, axis=0, prepend=0)
+    flow = np.nan_to_num(Δamount * price)
+    # Sum the holdings per entity
+    code, entities = pd.factorize(labels)
+    onehot = np.zeros((len(code), len(entities)))
+    onehot[np.arange(len(code)), code] = 1
+    return (
+        pd.DataFrame(value @ onehot, panel.dates, entities),
+        pd.DataFrame(flow @ onehot, panel.dates, entities),
+    )
+
+
+def time_weighted_return(value: pd.DataFrame, flow: pd.DataFrame) -> pd.DataFrame:
+    """The cumulative time-weighted return from the first date to every date.
+
+    Every period's return is its gain (the change in value minus the inflow)
+    over the value at the start of the period, so inflows do not count as returns.
+    """
+    v = value.to_numpy()
+    previous = np.r_[np.zeros((1, v.shape[1])), v[:-1]]
+    gain = v - previous - flow.to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = np.where(previous > 0, gain / previous, 0.0)
+    return pd.DataFrame(np.cumprod(1 + r, axis=0) - 1, value.index, value.columns)
+
+
+def _years(index: pd.DatetimeIndex) -> np.ndarray:
+    return ((index - index[0]) / pd.Timedelta("365D")).to_numpy(dtype=float)
+
+
+def modified_dietz(value: pd.DataFrame, flow: pd.DataFrame) -> pd.DataFrame:
+    """The Modified Dietz return from the first date to every date, the gain
+    over the starting value plus the inflows weighted by the fraction of the
+    period they were invested."""
+    v = value.to_numpy()
+    f = flow.to_numpy().copy()
+    f[0] = 0  # the starting value is the first inflow
+    t = _years(value.index)[:, None]
+    cum_flow = np.cumsum(f, axis=0)
+    cum_t_flow = np.cumsum(t * f, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weighted = (t * cum_flow - cum_t_flow) / t  # Σ F_i (t - t_i) / (t - t_0)
+        md = (v - v[0] - cum_flow) / (v[0] + weighted)
+    md[0] = 0
+    return pd.DataFrame(md, value.index, value.columns)
+
+
+def irr(
+    value: pd.DataFrame, flow: pd.DataFrame, n_iter: int = 100, tol: float = 1e-10
+) -> pd.Series:
+    """The annualized money-weighted return (internal rate of return) over the
+    whole period, solved with Newton's method for all entities at once.
+
+    It is the rate ``r`` at which the inflows, compounded to the last date,
+    equal the last value: ``Σ flow_i (1 + r)^(t_end - t_i) = value_end``.
+    NaN where it does not converge.
+    """
+    f = flow.to_numpy()
+    end_value = value.to_numpy()[-1]
+    tau = (_years(value.index)[-1] - _years(value.index))[:, None]
+    r = np.full(f.shape[1], 0.1)
+    converged = np.zeros(f.shape[1], dtype=bool)
+    with np.errstate(all="ignore"):
+        for _ in range(n_iter):
+            growth = (1 + r) ** tau
+            residual = (f * growth).sum(axis=0) - end_value
+            slope = (f * tau * growth / (1 + r)).sum(axis=0)
+            step = residual / slope
+            r = np.maximum(r - step, -0.9999)
+            converged = np.abs(step) < tol
+            if converged.all():
+                break
+    return pd.Series(np.where(converged, r, np.nan), value.columns, name="irr")
+
+
+def return_summary(
+    df: pd.DataFrame, by: str = "symbol", attribution: pd.DataFrame | None = None
+) -> pd.DataFrame:
+    """Per entity (see `cash_flows`) the last value, the net inflow, the gain,
+    the time-weighted and Modified Dietz return, and the annualized IRR."""
+    value, flow = cash_flows(df, by, attribution)
+    inflow = flow.sum()
+    return pd.DataFrame(
+        {
+            "value": value.iloc[-1],
+            "net inflow": inflow,
+            "gain": value.iloc[-1] - inflow,
+            "TWR (%)": 100 * time_weighted_return(value, flow).iloc[-1],
+            "Modified Dietz (%)": 100 * modified_dietz(value, flow).iloc[-1],
+            "IRR (%/year)": 100 * irr(value, flow),
+        }
+    )
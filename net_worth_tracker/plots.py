@@ -2,21 +2,22 @@ import matplotlib
 import matplotlib.pyplot as plt
 import numpy as np
 
+from net_worth_tracker.panel import Panel
 
-def plot_pie_at_date(df, date, min_euro=1, show=True, fname=None, fig=None, ax=None):
+
+def plot_pie_at_date(
+    df, date, min_euro=1, show=True, fname=None, fig=None, ax=None, panel=None
+):
     if fig is None:
         fig, ax = plt.subplots(figsize=(15, 15))
     else:
         ax.clear()
-    df = df[df.value > min_euro]
-    last = (
-        df[df.date == date]
-        .set_index("symbol")
-        .value.dropna()
-        .sort_values(ascending=False)
-    )
+    if panel is None:
+        panel = Panel.from_df(df)
+    last = panel.at(date).value
+    last = last[last > min_euro].sort_values(ascending=False)
 
-    coins = sorted(df.symbol.unique())
+    coins = list(panel.symbols[(panel.value > min_euro).any(axis=0)])
     color_map = dict(
         zip(coins, matplotlib.cm.get_cmap("tab20c")(np.linspace(0, 1, len(coins))))
     )
@@ -46,22 +47,19 @@ def plot_pie_at_date(df, date, min_euro=1, show=True, fname=None, fig=None, ax=N
         plt.show()
 
 
-def plot_barh_at_date(df, date, min_euro=10, show=True, fname=None, fig=None, ax=None):
+def plot_barh_at_date(
+    df, date, min_euro=10, show=True, fname=None, fig=None, ax=None, panel=None
+):
     if fig is None:
         fig, ax = plt.subplots(figsize=(15, 15))
     else:
         ax.clear()
-    to_drop = df.value < min_euro
-    # dropped = df[to_drop].value.sum()
-
-    last = (
-        df[(~to_drop) & (df.date == date)]
-        .set_index("symbol")
-        .value.dropna()
-        .sort_values(ascending=True)
-    )
+    if panel is None:
+        panel = Panel.from_df(df)
+    last = panel.at(date).value
+    last = last[~(last < min_euro)].dropna().sort_values(ascending=True)
 
-    coins = sorted(df.symbol.unique())
+    coins = list(panel.symbols)
     coins.append("others")
     color_map = dict(
         zip(coins, matplotlib.cm.get_cmap("tab20c")(np.linspace(0, 1, len(coins))))
@@ -88,7 +86,7 @@ def plot_barh_at_date(df, date, min_euro=10, show=True, fname=None, fig=None, ax
 
     ax.set_title(f"Value at {date}")
     ax.set_axis_off()
-    ax.set_xlim(0, 1.2 * df.value.max())
+    ax.set_xlim(0, 1.2 * np.nanmax(panel.value))
 
     if fname is not None:
         plt.savefig(fname)
@@ -97,19 +95,16 @@ def plot_barh_at_date(df, date, min_euro=10, show=True, fname=None, fig=None, ax
 
 
 def plot_barh_at_date_with_profits(
-    df, date, min_euro=10, show=True, fname=None, fig=None, ax=None
+    df, date, min_euro=10, show=True, fname=None, fig=None, ax=None, panel=None
 ):
     if fig is None:
         fig, ax = plt.subplots(figsize=(15, 15))
     else:
         ax.clear()
-    to_drop = df.value < min_euro
-
-    sel = (
-        df[(~to_drop) & (df.date == date)]
-        .set_index("symbol")
-        .sort_values(ascending=True, by="value")
-    )
+    if panel is None:
+        panel = Panel.from_df(df)
+    sel = panel.at(date)
+    sel = sel[~(sel.value < min_euro)].sort_values(ascending=True, by="value")
     value = sel.value
     profits = sel.amount * (sel.price - sel.avg_price)
     colors = ["r" if p < 0 else "g" for p in profits]
@@ -135,7 +130,7 @@ def plot_barh_at_date_with_profits(
 
     ax.set_title(f"Value at {date}")
     ax.set_axis_off()
-    ax.set_xlim(0, 1.2 * df.value.max())
+    ax.set_xlim(0, 1.2 * np.nanmax(panel.value))
 
     if fname is not None:
         plt.savefig(fname)
@@ -0,0 +1,143 @@
+"""Persistent index of the timestamped files in a data folder.
+
+Maps ``(prefix, ext, date)`` to a filename in an SQLite table
+(``<folder>/.snapshots.sqlite``), so range queries and "latest" lookups use a
+B-tree lookup instead of globbing and parsing every filename in the folder.
+
+The index is built from the folder contents on first use and synced again
+whenever the modification time of the folder changed since the last sync, so
+files that are added or removed by other means are picked up as well. Writers
+call `add` after a file is written. A file that is removed without changing
+the folder mtime can still be returned by `query`, so readers skip a
+`FileNotFoundError`; `latest` skips such files itself.
+"""
+from __future__ import annotations
+
+import contextlib
+import datetime
+import re
+import sqlite3
+import time
+from pathlib import Path
+
+INDEX_NAME = ".snapshots.sqlite"
+_PATTERN = re.compile(r"^(?P<prefix>.*?)(?P<date>\d{8}-\d{6})(?P<ext>\.[^.]*)?$")
+# A folder that changed this recently might change again within the resolution
+# of its modification time, so its mtime is not trusted until it is older
+_MTIME_RESOLUTION = 2  # seconds
+
+
+def _parse(fname: Path) -> tuple[str, str, datetime.datetime] | None:
+    match = _PATTERN.match(fname.name)
+    if match is None:
+        return None
+    date = datetime.datetime.strptime(match["date"], "%Y%m%d-%H%M%S")
+    return match["prefix"], match["ext"] or "", date
+
+
+@contextlib.contextmanager
+def _connect(folder):
+    con = sqlite3.connect(Path(folder) / INDEX_NAME)
+    try:
+        # Keep the rollback journal in memory, such that writing the index does
+        # not create files in (and bump the mtime of) the folder it indexes
+        con.execute("PRAGMA journal_mode = MEMORY")
+        with con:
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                "prefix TEXT, ext TEXT, date TEXT, fname TEXT,"
+                "PRIMARY KEY (prefix, ext, date))"
+            )
+            con.execute("CREATE TABLE IF NOT EXISTS synced (mtime_ns INTEGER)")
+            _sync(con, Path(folder))
+            yield con
+    finally:
+        con.close()
+
+
+def _sync(con, folder: Path) -> None:
+    mtime_ns = folder.stat().st_mtime_ns
+    row = con.execute("SELECT mtime_ns FROM synced").fetchone()
+    if row is not None and row[0] == mtime_ns:
+        return
+    indexed = {fname for (fname,) in con.execute("SELECT fname FROM snapshots")}
+    present = {fname.name for fname in folder.iterdir()}
+    con.executemany(
+        "DELETE FROM snapshots WHERE fname = ?", [(f,) for f in indexed - present]
+    )
+    _insert(con, [folder / fname for fname in present - indexed])
+    if time.time() - mtime_ns / 1e9 < _MTIME_RESOLUTION:
+        mtime_ns = -1  # sync again next time
+    con.execute("DELETE FROM synced")
+    con.execute("INSERT INTO synced VALUES (?)", (mtime_ns,))
+
+
+def _insert(con, fnames) -> None:
+    rows = []
+    for fname in fnames:
+        parsed = _parse(fname)
+        if parsed is not None:
+            prefix, ext, date = parsed
+            rows.append((prefix, ext, date.isoformat(), fname.name))
+    con.executemany("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?)", rows)
+
+
+def add(fname: Path) -> None:
+    """Register ``fname`` (which must be written already) in the index of its folder."""
+    with _connect(fname.parent) as con:
+        _insert(con, [fname])
+
+
+def rebuild(folder) -> None:
+    """Recreate the index from the files that are in ``folder``."""
+    (Path(folder) / INDEX_NAME).unlink(missing_ok=True)
+    with _connect(folder):
+        pass
+
+
+def query(
+    folder,
+    prefix: str = "",
+    ext: str = ".json",
+    start: datetime.datetime | None = None,
+    end: datetime.datetime | None = None,
+) -> dict[datetime.datetime, Path]:
+    """Return ``{date: fname}`` for ``start <= date <= end``, sorted by date."""
+    if not Path(folder).is_dir():
+        return {}
+    sql = "SELECT date, fname FROM snapshots WHERE prefix = ? AND ext = ?"
+    args = [prefix, ext]
+    if start is not None:
+        sql += " AND date >= ?"
+        args.append(start.isoformat())
+    if end is not None:
+        sql += " AND date <= ?"
+        args.append(end.isoformat())
+    with _connect(folder) as con:
+        rows = con.execute(sql + " ORDER BY date", args).fetchall()
+    return {
+        datetime.datetime.fromisoformat(date): Path(folder) / fname
+        for date, fname in rows
+    }
+
+
+def latest(
+    folder,
+    prefix: str = "",
+    ext: str = ".json",
+    end: datetime.datetime | None = None,
+) -> tuple[datetime.datetime, Path] | None:
+    """Return the ``(date, fname)`` of the newest entry (at or before ``end``) or None."""
+    if not Path(folder).is_dir():
+        return None
+    sql = "SELECT date, fname FROM snapshots WHERE prefix = ? AND ext = ?"
+    args = [prefix, ext]
+    if end is not None:
+        sql += " AND date <= ?"
+        args.append(end.isoformat())
+    with _connect(folder) as con:
+        rows = con.execute(sql + " ORDER BY date DESC", args)
+        for date, fname in rows:
+            if (Path(folder) / fname).exists():
+                return datetime.datetime.fromisoformat(date), Path(folder) / fname
+    return None
@@ -0,0 +1,261 @@
+"""Columnar snapshot store.
+
+Every snapshot is flattened into rows of ``(date, where, symbol, amount, price, value)``
+and stored in Parquet files partitioned by month. `append` writes every snapshot to a
+small file of its own, e.g. ``data/columnar/2023-05.08-120000-000000.parquet``, and
+`compact` merges those into one file per month, e.g. ``data/columnar/2023-05.parquet``.
+Reading a date range only opens the files of the months that overlap it and only
+decodes the requested columns.
+"""
+from __future__ import annotations
+
+import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["date", "where", "symbol", "amount", "price", "value"]
+SUBFOLDER = "columnar"
+# (max age, resolution) tiers used by `compact`, None means everything
+DEFAULT_RETENTION = (
+    (datetime.timedelta(days=7), None),
+    (datetime.timedelta(days=365), "1D"),
+    (None, "7D"),
+)
+
+
+def _folder(folder) -> Path:
+    return Path(folder) / SUBFOLDER
+
+
+def _partition(folder, date: datetime.datetime) -> Path:
+    return _folder(folder) / f"{date:%Y-%m}.parquet"
+
+
+def _month(fname: Path) -> str:
+    return fname.name[:7]  # "YYYY-MM"
+
+
+def _is_appended(fname: Path) -> bool:
+    """Whether ``fname`` was written by `append` and not merged by `compact` yet."""
+    return fname.name.count(".") > 1
+
+
+def _partitions(
+    folder,
+    start: datetime.datetime | None = None,
+    end: datetime.datetime | None = None,
+) -> list[Path]:
+    fnames = sorted(_folder(folder).glob("*.parquet"))
+    start_str = None if start is None else f"{start:%Y-%m}"
+    end_str = None if end is None else f"{end:%Y-%m}"
+    return [
+        fname
+        for fname in fnames
+        if (start_str is None or _month(fname) >= start_str)
+        and (end_str is None or _month(fname) <= end_str)
+    ]
+
+
+def balances_to_rows(date: datetime.datetime, balances: dict) -> pd.DataFrame:
+    """Flatten a ``balances`` dict to long rows; missing price/value become NaN."""
+    rows = [
+        (
+            date,
+            where,
+            symbol,
+            float(info["amount"]),
+            float(info.get("price", np.nan)),
+            float(info.get("value", np.nan)),
+        )
+        for where, bals in balances.items()
+        for symbol, info in bals.items()
+    ]
+    df = pd.DataFrame(rows, columns=COLUMNS)
+    df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+def _write(df: pd.DataFrame, fname: Path) -> None:
+    fname.parent.mkdir(parents=True, exist_ok=True)
+    tmp = fname.with_suffix(".tmp")
+    df.to_parquet(tmp, index=False)
+    tmp.replace(fname)
+
+
+def _replace(df: pd.DataFrame, folder, months: set[str], stale: list[Path]) -> None:
+    """Write the rows of ``df`` as the partitions of ``months``, then remove the
+    ``stale`` appended files and the partitions of the months without rows."""
+    df = df[df.date.dt.strftime("%Y-%m").isin(months)]
+    for month, part in df.groupby(df.date.dt.strftime("%Y-%m"), sort=True):
+        _write(part.reset_index(drop=True), _folder(folder) / f"{month}.parquet")
+    # Only once all partitions are written, so a failure does not lose data
+    for fname in stale:
+        fname.unlink(missing_ok=True)
+    for month in months - set(df.date.dt.strftime("%Y-%m")):
+        month = datetime.datetime.strptime(month, "%Y-%m")
+        _partition(folder, month).unlink(missing_ok=True)
+
+
+def write(df: pd.DataFrame, folder=Path("data")) -> None:
+    """Write long rows to the store, replacing the months they fall in."""
+    months = set(df.date.dt.strftime("%Y-%m"))
+    stale = [
+        fname
+        for fname in _partitions(folder)
+        if _is_appended(fname) and _month(fname) in months
+    ]
+    _replace(df, folder, months, stale)
+
+
+def append(
+    balances: dict,
+    folder=Path("data"),
+    date: datetime.datetime | None = None,
+) -> None:
+    """Append a single snapshot as a file of its own, see `compact`."""
+    if date is None:
+        date = datetime.datetime.now()
+    rows = balances_to_rows(date, balances)
+    _write(rows, _folder(folder) / f"{date:%Y-%m.%d-%H%M%S-%f}.parquet")
+
+
+def _read_files(fnames, columns=None, filters=None) -> pd.DataFrame:
+    dfs = [pd.read_parquet(f, columns=columns, filters=filters) for f in fnames]
+    if not dfs:
+        return pd.DataFrame(columns=columns or COLUMNS)
+    df = pd.concat(dfs, ignore_index=True)
+    return df.sort_values("date", kind="stable", ignore_index=True)
+
+
+def read(
+    folder=Path("data"),
+    start: datetime.datetime | None = None,
+    end: datetime.datetime | None = None,
+    columns: list[str] | None = None,
+) -> pd.DataFrame:
+    """Read the rows with ``start <= date <= end``, sorted by date.
+
+    Only the partitions overlapping the range are opened and only ``columns``
+    (``date`` is always included) are decoded.
+    """
+    if columns is not None:
+        columns = ["date"] + [c for c in columns if c != "date"]
+    filters = []
+    if start is not None:
+        filters.append(("date", ">=", pd.Timestamp(start)))
+    if end is not None:
+        filters.append(("date", "<=", pd.Timestamp(end)))
+    return _read_files(_partitions(folder, start, end), columns, filters or None)
+
+
+def snapshot_at(folder, date: datetime.datetime) -> pd.DataFrame:
+    """The rows of the last snapshot at or before ``date`` (empty if there is none),
+    reading the months backwards from the month of ``date``."""
+    end = pd.Timestamp(date)
+    fnames = _partitions(folder, end=date)
+    for month in sorted({_month(fname) for fname in fnames}, reverse=True):
+        in_month = [fname for fname in fnames if _month(fname) == month]
+        df = _read_files(in_month, filters=[("date", "<=", end)])
+        if not df.empty:
+            return df[df.date == df.date.max()].reset_index(drop=True)
+    return pd.DataFrame(columns=COLUMNS)
+
+
+def to_datas(df: pd.DataFrame) -> dict[datetime.datetime, dict]:
+    """Convert long rows back to the ``{date: {"balances": ...}}`` shape of ``load_data``."""
+    datas = {}
+    for date, gr in df.groupby("date", sort=True):
+        balances = {}
+        for where, symbol, amount, price, value in zip(
+            gr["where"], gr.symbol, gr.amount, gr.price, gr.value
+        ):
+            info = {"amount": amount}
+            if not np.isnan(price):
+                info["price"] = price
+            if not np.isnan(value):
+                info["value"] = value
+            balances.setdefault(where, {})[symbol] = info
+        datas[date.to_pydatetime()] = {"balances": balances}
+    return datas
+
+
+def _extreme_dates(df, ignore, ignore_symbols, renames) -> set[pd.Timestamp]:
+    """Dates at which a symbol or the total reached its highest or lowest price or
+    value, on the renamed per ``(date, symbol)`` totals that `utils.overview_df` uses.
+    """
+    from net_worth_tracker.utils import long_to_df  # circular import
+
+    per_symbol = long_to_df(df, ignore, ignore_symbols, renames, wallet_columns=False)
+    if "value" not in per_symbol:
+        return set()
+    dates = set()
+    for col in ["price", "value"]:
+        values = per_symbol[col].replace([np.inf, -np.inf], np.nan).dropna()
+        by_symbol = values.groupby(per_symbol.symbol[values.index])
+        for idx in (by_symbol.idxmax(), by_symbol.idxmin()):
+            dates.update(per_symbol.date[idx.to_numpy()])
+    total = per_symbol.groupby("date").value.sum()
+    dates.update([total.idxmax(), total.idxmin()])
+    return dates
+
+
+def compact(
+    folder=Path("data"),
+    retention=DEFAULT_RETENTION,
+    keep_extremes: bool = True,
+    now: datetime.datetime | None = None,
+    ignore=(),
+    ignore_symbols=(),
+    renames=None,
+) -> int:
+    """Downsample the store according to ``retention``.
+
+    ``retention`` is a sequence of ``(max_age, resolution)`` tiers, ordered by age.
+    Within a tier only the last snapshot per ``resolution`` (a pandas frequency,
+    or None to keep all) is kept; the last tier should have ``max_age=None``.
+    With ``keep_extremes`` the snapshots with the all-time high/low price and
+    value of every symbol and of the total are kept too, such that the ATH/ATL
+    of `utils.overview_df` do not change. The symbols are combined like
+    `utils.long_to_df` does with ``ignore``, ``ignore_symbols`` and ``renames``
+    (default: `utils.RENAMES`), so pass the ones used for the analysis.
+    The files written by `append` are merged into their month's partition.
+    Returns the number of removed snapshots.
+    """
+    if now is None:
+        now = datetime.datetime.now()
+    if renames is None:
+        from net_worth_tracker.utils import RENAMES as renames  # circular import
+    # Snapshots that are appended while compacting are left for the next run
+    fnames = _partitions(folder)
+    stale = [fname for fname in fnames if _is_appended(fname)]
+    df = _read_files(fnames)
+    dates = pd.Series(df.date.unique())
+    age = pd.Timestamp(now) - dates
+    keep = set()
+    min_age = pd.Timedelta.min
+    for max_age, freq in retention:
+        in_tier = age >= min_age
+        if max_age is not None:
+            in_tier &= age < max_age
+            min_age = pd.Timedelta(max_age)
+        sel = dates[in_tier]
+        if freq is not None:
+            sel = sel.groupby(sel.dt.floor(freq)).max()
+        keep.update(sel)
+    if keep_extremes and not df.empty:
+        keep.update(_extreme_dates(df, ignore, ignore_symbols, renames))
+
+    removed = dates[~dates.isin(keep)]
+    months = set(removed.dt.strftime("%Y-%m")) | {_month(f) for f in stale}
+    _replace(df[df.date.isin(keep)], folder, months, stale)
+    return len(removed)
+
+
+if __name__ == "__main__":
+    from net_worth_tracker.ignore import ignore_symbols, ignore_wallets
+
+    # Combine the symbols like the crypto report does, so its ATH/ATL are kept
+    removed = compact(ignore=ignore_wallets, ignore_symbols=ignore_symbols)
+    print(f"Removed {removed} snapshots")
@@ -6,9 +6,12 @@ import contextlib
 import datetime
 import getpass
 import json
+import os
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from configparser import ConfigParser
-from functools import lru_cache
+from functools import lru_cache, partial
+from itertools import islice
 from pathlib import Path
 
 import keyring
@@ -17,6 +20,15 @@ import pandas as pd
 from currency_converter import CurrencyConverter
 from keyrings.cryptfile.cryptfile import CryptFileKeyring
 
+from net_worth_tracker import snapshot_index, store
+from net_worth_tracker.cache import cache_key, file_cache
+from net_worth_tracker.panel import Panel
+
+try:
+    import orjson
+except ImportError:  # optional, only used with `fast_json=True`
+    orjson = None
+
 DEFAULT_CONFIG = Path("~/.config/crypto_etf.conf").expanduser()
 RENAMES = {
     "BTCB": "BTC",
@@ -145,46 +157,157 @@ def save_data(
     balances,
     bsc,
     folder=Path("data"),
+    columnar: bool = False,
 ):
+    """Save a snapshot as a JSON file, or append it to the columnar
+    store (see `net_worth_tracker.store`) if ``columnar=True``.
+
+    The columnar store only holds ``balances``, so it refuses a ``bsc`` payload.
+    """
+    if columnar:
+        if bsc is not None:
+            raise ValueError(
+                "The columnar store cannot hold the `bsc` payload,"
+                " save it with `columnar=False`."
+            )
+        store.append(balances, folder)
+        return
     data = dict(balances=balances, defi=dict(bsc=bsc))
     fname = fname_from_date(folder)
     with fname.open("w") as f:
         json.dump(data, f, indent="  ")
+    snapshot_index.add(fname)
+
+
+def _min_date(ndays: int | None) -> datetime.datetime:
+    if ndays is None:
+        ndays = 365 * 100  # 100 years
+    return datetime.datetime.today() - datetime.timedelta(days=ndays)
 
 
 def _fnames(
     folder=Path("data"), ndays: int | None = 365, prefix: str = ""
 ) -> dict[datetime.datetime, Path]:
-    fnames = sorted(Path(folder).glob(f"{prefix}*.json"))
-    if ndays is None:
-        ndays = 365 * 100  # 100 years
-    min_date = datetime.datetime.today() - datetime.timedelta(days=ndays)
-    datas = {}
-    for fname in fnames:
-        date_str = fname.with_suffix("").name
-        if prefix:
-            date_str = date_str.split(prefix, 1)[1]
-        dt = datetime.datetime.strptime(date_str, "%Y%m%d-%H%M%S")
-        if dt >= min_date:
-            datas[dt] = fname
-    return datas
+    return snapshot_index.query(folder, prefix, ".json", start=_min_date(ndays))
 
 
 def latest_fname(folder, prefix: str = "") -> Path | None:
-    fnames = _fnames(folder, ndays=None, prefix=prefix)
-    if fnames:
-        return fnames[max(fnames.keys())]
+    latest = snapshot_index.latest(folder, prefix, ".json")
+    if latest:
+        return latest[1]
     else:
         return None
 
 
-def load_data(folder=Path("data"), ndays: int = 365, prefix: str = ""):
+def load_data(
+    folder=Path("data"),
+    ndays: int | None = 365,
+    prefix: str = "",
+    columnar: bool = False,
+    n_workers: int | None = 1,
+    use_processes: bool = False,
+    fast_json: bool = False,
+):
+    """Load the snapshots of the last ``ndays`` days as ``{date: data}``.
+
+    With ``n_workers != 1`` the JSON files are read and decoded in a thread pool
+    (or a process pool if ``use_processes=True``, which helps when decoding is the
+    bottleneck); ``None`` uses the executor's default number of workers.
+    With ``fast_json=True`` the files are decoded with ``orjson`` if it is installed.
+    With ``columnar=True`` the rows of `net_worth_tracker.store` are converted
+    back to dicts; use ``load_df(columnar=True)`` to get the frame without that.
+    """
+    if columnar:
+        start = None
+        if ndays is not None:
+            start = datetime.datetime.today() - datetime.timedelta(days=ndays)
+        return store.to_datas(store.read(folder, start=start))
     fnames = _fnames(folder, ndays, prefix)
-    datas = {}
-    for dt, fname in fnames.items():
-        with fname.open("r") as f:
-            datas[dt] = json.load(f)
-    return datas
+    return _read_fnames(fnames, n_workers, use_processes, fast_json)
+
+
+def _read_json(fname: Path, fast_json: bool = False):
+    if fast_json and orjson is not None:
+        content = fname.read_bytes()
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:  # e.g., NaN, which orjson rejects
+            return json.loads(content)
+    with fname.open("r") as f:
+        return json.load(f)
+
+
+def _read_snapshot(fname: Path, fast_json: bool = False):
+    try:
+        return _read_json(fname, fast_json)
+    except FileNotFoundError:  # removed after the index was synced
+        return None
+
+
+@file_cache()
+def read_json(fname, fast_json: bool = False):
+    """The parsed JSON file ``fname``, cached on disk for as long as the file is
+    unchanged, see `cache.file_cache`."""
+    return _read_json(Path(fname), fast_json)
+
+
+def _read_fnames(
+    fnames: dict[datetime.datetime, Path],
+    n_workers: int | None = 1,
+    use_processes: bool = False,
+    fast_json: bool = False,
+):
+    read = partial(_read_snapshot, fast_json=fast_json)
+    if n_workers == 1 or len(fnames) <= 1:
+        datas = {dt: read(fname) for dt, fname in fnames.items()}
+    else:
+        executor = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        # Only used by ProcessPoolExecutor, to amortize the inter-process overhead
+        chunksize = max(1, len(fnames) // (4 * (n_workers or os.cpu_count() or 1)))
+        with executor(n_workers) as ex:
+            results = ex.map(read, fnames.values(), chunksize=chunksize)
+            datas = dict(zip(fnames.keys(), results))
+    return {dt: data for dt, data in datas.items() if data is not None}
+
+
+def iter_snapshots(
+    folder=Path("data"),
+    start: datetime.datetime | None = None,
+    end: datetime.datetime | None = None,
+    prefix: str = "",
+):
+    """Yield the ``(date, data)`` snapshots with ``start <= date <= end``
+    one at a time, in chronological order."""
+    for dt, fname in snapshot_index.query(folder, prefix, ".json", start, end).items():
+        data = _read_snapshot(fname)
+        if data is not None:
+            yield dt, data
+
+
+def migrate_to_columnar(folder=Path("data"), prefix: str = "") -> int:
+    """Copy all JSON snapshots in ``folder`` into the columnar store.
+
+    The rows already in the store are kept, also those of the snapshots that
+    were only saved with ``save_data(columnar=True)``; a snapshot that is in
+    both is taken from its JSON file, so this can be rerun.
+    Returns the number of migrated snapshots.
+    """
+    datas = load_data(folder, ndays=None, prefix=prefix)
+    if datas:
+        df = pd.concat(
+            [
+                store.balances_to_rows(dt, data["balances"])
+                for dt, data in datas.items()
+            ],
+            ignore_index=True,
+        )
+        existing = store.read(folder)
+        existing = existing[~existing.date.isin(df.date)]
+        if not existing.empty:
+            df = pd.concat([existing, df], ignore_index=True)
+            df = df.sort_values("date", kind="stable", ignore_index=True)
+        store.write(df, folder)
+    return len(datas)
 
 
 def data_to_df(date, data, ignore=(), ignore_symbols=(), renames=RENAMES):
@@ -225,15 +348,304 @@ def data_to_df(date, data, ignore=(), ignore_symbols=(), renames=RENAMES):
     return df
 
 
-def datas_to_df(datas, ignore=(), ignore_symbols=(), renames=RENAMES):
-    dfs = [
-        data_to_df(date, data, ignore, ignore_symbols, renames)
+# The columns of the long table that `long_to_df` needs
+LONG_COLUMNS = ["date", "where", "symbol", "amount", "value"]
+
+
+def _flatten(datas) -> pd.DataFrame:
+    """All snapshots as one long table; a missing ``value`` becomes NaN."""
+    rows = [
+        (date, where, coin, info["amount"], info.get("value", np.nan))
         for date, data in datas.items()
+        for where, bals in data["balances"].items()
+        for coin, info in bals.items()
     ]
-    df = pd.concat(dfs).sort_values("date")
+    return pd.DataFrame(rows, columns=LONG_COLUMNS)
+
+
+def _ordered_group_sum(group, pos, x, n):
+    """Per-group sum that adds the entries in order, like ``sum()`` does,
+    so the result is bit-for-bit equal to `data_to_df`'s."""
+    total = np.zeros(n)
+    for i in range(pos.max() + 1 if len(pos) else 0):
+        sel = pos == i
+        total[group[sel]] += x[sel]
+    return total
+
+
+def _aggregate(long, ignore, ignore_symbols, renames):
+    """Sum ``long`` per (date, symbol) like `data_to_df` does.
+
+    Returns the per (date, symbol) columns and a table with the ``row`` (in
+    these columns), ``where`` and ``ratio`` of the value of every wallet holding it.
+    """
+    long = long[
+        ~long["where"].isin(ignore)
+        & ~long.symbol.str.startswith("moo")  # ignore Beefy.Finance tokens
+        & ~long.symbol.isin(ignore_symbols)
+    ]
+    if long.empty:  # e.g., everything is ignored
+        columns = {
+            "symbol": np.array([], dtype=object),
+            "date": np.array([], dtype="datetime64[ns]"),
+            "amount": np.array([]),
+            "value": np.array([]),
+            "price": np.array([]),
+        }
+        ratios = pd.DataFrame(
+            {
+                "row": np.array([], dtype=int),
+                "where": np.array([], dtype=object),
+                "ratio": np.array([]),
+            }
+        )
+        return columns, ratios
+    symbol = long.symbol.map(renames).fillna(long.symbol).to_numpy()
+    where = long["where"].to_numpy()
+    date = long.date.to_numpy()
+    amount = long.amount.to_numpy(dtype=float)
+    value = long.value.to_numpy(dtype=float)
+
+    # One group per (date, symbol), numbered in order of first appearance
+    date_code, _ = pd.factorize(date)
+    symbol_code, _ = pd.factorize(symbol)
+    group, _ = pd.factorize(date_code * (symbol_code.max() + 1) + symbol_code)
+    n = group.max() + 1 if len(group) else 0
+    pos = pd.Series(group).groupby(group).cumcount().to_numpy()
+    first = np.unique(group, return_index=True)[1]
+
+    total_amount = _ordered_group_sum(group, pos, amount, n)
+    total_value = _ordered_group_sum(group, pos, value, n)  # NaN if any is missing
+    has_value = ~np.isnan(total_value)
+    keep = ~has_value | ~((total_value == 0) | (total_amount == 0))
+    row = np.cumsum(keep) - 1  # row in the result of each kept group
+
+    # Ratio of the value per wallet; on duplicates the last one wins, like in
+    # the dict comprehension of `data_to_df`, but the position is the first one
+    entry = keep[group] & has_value[group]
+    ratios = pd.DataFrame(
+        {
+            "row": row[group[entry]],
+            "where": where[entry],
+            "ratio": value[entry] / total_value[group[entry]],
+        }
+    )
+    ratios = (
+        ratios.groupby(["row", "where"], sort=False)
+        .ratio.last()
+        .reset_index()
+        .sort_values("row", kind="stable", ignore_index=True)
+    )
+    columns = {
+        "symbol": symbol[first][keep],
+        "date": date[first][keep],
+        "amount": total_amount[keep],
+    }
+    if has_value[keep].any():
+        columns["value"] = total_value[keep]
+        columns["price"] = total_value[keep] / total_amount[keep]
+    return columns, ratios
+
+
+def long_to_df(
+    long, ignore=(), ignore_symbols=(), renames=RENAMES, wallet_columns=True
+):
+    """Vectorized equivalent of applying `data_to_df` to every snapshot and
+    concatenating the results, for a long ``(date, where, symbol, amount, value)``
+    table, such as returned by `net_worth_tracker.store.read`.
+
+    With ``wallet_columns=False`` the ``ratio_in_*`` and ``value_in_*`` columns
+    are left out, see `long_to_attribution` for a long alternative.
+    """
+    columns, ratios = _aggregate(long, ignore, ignore_symbols, renames)
+    if wallet_columns and len(ratios):
+        date_code, dates = pd.factorize(columns["date"])
+        where_code, wheres = pd.factorize(ratios["where"])
+        pair_date = date_code[ratios.row]
+        # Wallets that appear on a date get a ratio of 0 for the other symbols
+        present = np.zeros((len(dates), len(wheres)), dtype=bool)
+        present[pair_date, where_code] = True
+        ratio = np.where(present[date_code], 0.0, np.nan)
+        ratio[ratios.row, where_code] = ratios.ratio
+        # Columns are ordered like `pd.concat` orders the per-snapshot columns
+        introduced_at = pd.Series(pair_date).groupby(where_code).first().to_numpy()
+        for i in np.unique(introduced_at):
+            new = np.flatnonzero(introduced_at == i)
+            for j in new:
+                columns[f"ratio_in_{wheres[j]}"] = ratio[:, j]
+            for j in new:
+                columns[f"value_in_{wheres[j]}"] = ratio[:, j] * columns["value"]
+    df = pd.DataFrame(columns)
+    return df.sort_values("date", kind="stable")
+
+
+def long_to_attribution(long, ignore=(), ignore_symbols=(), renames=RENAMES):
+    """The value per wallet of every (date, symbol) of `long_to_df`, as a long
+    ``(date, symbol, where, ratio, value)`` table with a row per holding.
+
+    This holds the same information as the ``ratio_in_*`` and ``value_in_*``
+    columns, without the NaN and zero entries of the wallets that do not hold a symbol.
+    """
+    columns, ratios = _aggregate(long, ignore, ignore_symbols, renames)
+    row = ratios.row.to_numpy()
+    ratio = ratios.ratio.to_numpy()
+    df = pd.DataFrame(
+        {
+            "date": columns["date"][row],
+            "symbol": columns["symbol"][row],
+            "where": ratios["where"].to_numpy(),
+            "ratio": ratio,
+            "value": ratio * columns["value"][row] if len(row) else ratio,
+        }
+    )
+    return df.sort_values("date", kind="stable", ignore_index=True)
+
+
+def wallet_totals(attribution) -> pd.DataFrame:
+    """The total value per wallet per date (dates × wallets) of a
+    `long_to_attribution` table, equal to summing the ``value_in_*`` columns per date.
+    """
+    totals = attribution.groupby(["date", "where"], sort=False).value.sum()
+    totals = totals.unstack("where", fill_value=0.0)
+    return totals[attribution["where"].unique()]
+
+
+def _datas_to_df(datas, ignore, ignore_symbols, renames, wallet_columns=True):
+    return long_to_df(_flatten(datas), ignore, ignore_symbols, renames, wallet_columns)
+
+
+def datas_to_df(
+    datas, ignore=(), ignore_symbols=(), renames=RENAMES, wallet_columns=True
+):
+    df = _datas_to_df(datas, ignore, ignore_symbols, renames, wallet_columns)
     return add_avg_price(df)
 
 
+def datas_to_attribution(datas, ignore=(), ignore_symbols=(), renames=RENAMES):
+    """The `long_to_attribution` table of the snapshots in ``datas``."""
+    return long_to_attribution(_flatten(datas), ignore, ignore_symbols, renames)
+
+
+def _avg_price_last(df):
+    return df[[c for c in df.columns if c != "avg_price"] + ["avg_price"]]
+
+
+def stream_datas_to_df(
+    snapshots,
+    ignore=(),
+    ignore_symbols=(),
+    renames=RENAMES,
+    chunksize: int = 500,
+    wallet_columns=True,
+):
+    """Like `datas_to_df` but for an iterable of chronologically ordered
+    ``(date, data)`` pairs, e.g., from `iter_snapshots`.
+
+    The snapshots are converted ``chunksize`` at a time, so only a single
+    chunk of raw snapshot dicts is held in memory.
+    """
+    snapshots = iter(snapshots)
+    dfs = []
+    state = None
+    while chunk := dict(islice(snapshots, chunksize)):
+        df = _datas_to_df(chunk, ignore, ignore_symbols, renames, wallet_columns)
+        if df.empty:  # everything is ignored
+            continue
+        df, state = _add_avg_price(df, state)
+        dfs.append(df)
+    if not dfs:
+        return datas_to_df({}, ignore, ignore_symbols, renames, wallet_columns)
+    return _avg_price_last(pd.concat(dfs, ignore_index=True))
+
+
+def load_df(
+    folder=Path("data"),
+    ndays: int | None = None,
+    prefix: str = "",
+    ignore=(),
+    ignore_symbols=(),
+    renames=RENAMES,
+    cache: bool = True,
+    wallet_columns=True,
+    columnar: bool = False,
+    **load_kwargs,
+):
+    """Equivalent to ``datas_to_df(load_data(folder, ndays, prefix), ...)``
+    but backed by an on-disk cache in ``folder / "cache"``.
+
+    With ``columnar=True`` the rows of `net_worth_tracker.store` are passed
+    to `long_to_df` directly, without a cache (and without ``prefix``).
+
+    The cache holds the frame of all snapshots and is keyed on ``prefix``,
+    ``ignore``, ``ignore_symbols``, ``renames`` and ``wallet_columns``.
+    Only snapshots newer than the last cached one are read and processed.
+    If the older snapshots differ from the cached ones (e.g., a snapshot was
+    removed) the cache is rebuilt. The rows of the last ``ndays`` days are
+    cut from the cached frame, see `_window`.
+    ``load_kwargs`` (``n_workers``, ``use_processes``, ``fast_json``) are
+    passed on to the JSON reader, see `load_data`.
+    """
+    if columnar:
+        start = None if ndays is None else _min_date(ndays)
+        long = store.read(folder, start, columns=LONG_COLUMNS)
+        df = long_to_df(long, ignore, ignore_symbols, renames, wallet_columns)
+        return add_avg_price(df)
+    if not cache:
+        datas = _read_fnames(_fnames(folder, ndays, prefix), **load_kwargs)
+        df = _datas_to_df(datas, ignore, ignore_symbols, renames, wallet_columns)
+        return add_avg_price(df)
+    fnames = _fnames(folder, None, prefix)
+    key = cache_key(
+        prefix,
+        sorted(ignore),
+        sorted(ignore_symbols),
+        sorted(renames.items()),
+        wallet_columns,
+    )
+    cache_fname = Path(folder) / "cache" / f"df-{key}.pickle"
+    cached = None
+    if cache_fname.exists():
+        cached = pd.read_pickle(cache_fname)
+        hwm = cached["dates"][-1]
+        if [dt for dt in fnames if dt <= hwm] != cached["dates"]:
+            cached = None
+
+    if cached is not None:
+        fnames = {dt: fname for dt, fname in fnames.items() if dt > hwm}
+        if not fnames:
+            return _window(cached["df"], ndays)
+    datas = _read_fnames(fnames, **load_kwargs)
+    df = _datas_to_df(datas, ignore, ignore_symbols, renames, wallet_columns)
+    dates = list(datas)
+    if cached is None:
+        df, state = _add_avg_price(df)
+    elif df.empty:  # everything in the new snapshots is ignored
+        df, state = cached["df"], cached["state"]
+        dates = cached["dates"] + dates
+    else:
+        df, state = _add_avg_price(df, cached["state"])
+        df = _avg_price_last(pd.concat([cached["df"], df], ignore_index=True))
+        dates = cached["dates"] + dates
+
+    cache_fname.parent.mkdir(exist_ok=True)
+    pd.to_pickle(dict(dates=dates, df=df, state=state), cache_fname)
+    return _window(df, ndays)
+
+
+def _window(df, ndays: int | None):
+    """The rows of the last ``ndays`` days of the `load_df` frame ``df``, as
+    if only those snapshots were loaded: the wallet columns of wallets
+    without rows are dropped and ``avg_price`` starts at the first row.
+    The other wallet columns keep their order in ``df``."""
+    in_window = df.date >= _min_date(ndays)
+    if in_window.all():
+        return df
+    df = df[in_window].drop(columns="avg_price")
+    wallet_columns = [c for c in df.columns if c.startswith(("ratio_in_", "value_in_"))]
+    empty = [c for c in wallet_columns if df[c].isna().all()]
+    return add_avg_price(df.drop(columns=empty))
+
+
 def get_df(key, datas):
     df = pd.DataFrame(
         [data[key] for data in datas.values()], [date for date in datas.keys()]
@@ -254,27 +666,78 @@ def get_df_wallet(wallet, datas):
     return df[order]
 
 
-def at_time_ago(df, time_ago):
-    now = datetime.datetime.now()
-    dt = now - time_ago
-    i = (df.date - dt).abs().argmin()
-    date = df.date.iloc[i]
-    return df[df.date == date].set_index("symbol")
+def _sorted_dates(df) -> np.ndarray:
+    """The unique dates of ``df``, which must be sorted by date."""
+    dates = df.date.to_numpy()
+    if len(dates) == 0:
+        return dates
+    return dates[np.r_[True, dates[1:] != dates[:-1]]]
+
+
+def _nearest_date(dates: np.ndarray, dt: datetime.datetime) -> np.datetime64:
+    """The date in the sorted ``dates`` that is closest to ``dt``,
+    the earlier one on a tie."""
+    dt = np.datetime64(dt)
+    i = np.searchsorted(dates, dt)
+    if i == len(dates) or (i > 0 and dt - dates[i - 1] <= dates[i] - dt):
+        i -= 1
+    return dates[i]
+
+
+def _rows_at(df, date) -> pd.DataFrame:
+    dates = df.date.to_numpy()
+    i, j = np.searchsorted(dates, date, "left"), np.searchsorted(dates, date, "right")
+    return df.iloc[i:j].set_index("symbol")
+
+
+def at_time_ago(df, time_ago, dates=None, now=None):
+    """The rows of ``df`` at the date closest to ``now - time_ago``.
+
+    ``dates`` are the sorted unique dates of ``df``; pass them (and ``df``
+    sorted by date) when doing many lookups, so each one is a binary search.
+    """
+    if not df.date.is_monotonic_increasing:
+        df = df.sort_values("date", kind="stable")
+    if dates is None:
+        dates = _sorted_dates(df)
+    if now is None:
+        now = datetime.datetime.now()
+    return _rows_at(df, _nearest_date(dates, now - time_ago))
 
 
-def overview_df(df, currency_symbol="€"):
+def overview_df(df, currency_symbol="€", horizons=None):
+    """Overview of the latest holdings with price changes and the ATH/ATL.
+
+    ``horizons`` maps extra labels to time deltas to add more price change
+    columns, e.g., ``{"90d": datetime.timedelta(days=90)}``.
+    """
     s = currency_symbol
-    df_24h = at_time_ago(df, datetime.timedelta(hours=24))
-    df_last = at_time_ago(df, datetime.timedelta(0))
-    df_1w = at_time_ago(df, datetime.timedelta(days=7))
-    df_30d = at_time_ago(df, datetime.timedelta(days=30))
-    df_last["1w price (%)"] = 100 * (df_last.price - df_1w.price) / df_1w.price
-    df_last["24h price (%)"] = 100 * (df_last.price - df_24h.price) / df_24h.price
-    df_last["30d price (%)"] = 100 * (df_last.price - df_30d.price) / df_30d.price
-    df_last[f"ATH price ({s})"] = ATH = df.groupby("symbol").max().price
-    df_last[f"ATH value ({s})"] = df.groupby("symbol").max().value
-    df_last[f"ATL value ({s})"] = df.groupby("symbol").min().value
-    ATL = df.groupby("symbol").min().price
+    if not df.date.is_monotonic_increasing:
+        df = df.sort_values("date", kind="stable")
+    dates = _sorted_dates(df)
+    now = datetime.datetime.now()
+    horizons = {
+        "1w": datetime.timedelta(days=7),
+        "24h": datetime.timedelta(hours=24),
+        "30d": datetime.timedelta(days=30),
+        **(horizons or {}),
+    }
+    df_last = at_time_ago(df, datetime.timedelta(0), dates, now)
+    for label, time_ago in horizons.items():
+        df_ago = at_time_ago(df, time_ago, dates, now)
+        df_last[f"{label} price (%)"] = (
+            100 * (df_last.price - df_ago.price) / df_ago.price
+        )
+    extremes = df.groupby("symbol", observed=True).agg(
+        ath_price=("price", "max"),
+        atl_price=("price", "min"),
+        ath_value=("value", "max"),
+        atl_value=("value", "min"),
+    )
+    df_last[f"ATH price ({s})"] = ATH = extremes.ath_price
+    df_last[f"ATH value ({s})"] = extremes.ath_value
+    df_last[f"ATL value ({s})"] = extremes.atl_value
+    ATL = extremes.atl_price
     df_last["ATH change (%)"] = 100 * (df_last.price - ATH) / ATH
     df_last["ATL change (%)"] = 100 * (df_last.price - ATL) / ATL
 
@@ -338,12 +801,10 @@ def euro_per_dollar():
     return c.convert(1, "USD", "EUR")
 
 
-def unique_dt_per_day(df):
-    df = df.set_index("date", drop=False)
-    return [
-        df.loc[str(date).split("T")[0]].index[-1]
-        for date in df.date.dt.normalize().unique()
-    ]
+def unique_dt_per_day(df, panel: Panel | None = None):
+    if panel is None:
+        panel = Panel.from_df(df)
+    return panel.last_per_day()
 
 
 @contextlib.contextmanager
@@ -371,38 +832,230 @@ def try_and_print_error(name=None):
         print(name, e)
 
 
-def add_avg_price(df):
-    def _add_avg_price(gr):
-        first = gr.iloc[0]
-        last = gr.iloc[-1]
-        gr["Δamount"] = gr.amount.diff()
-        assert abs(gr["Δamount"].sum() + first.amount - last.amount) < 1e-8
-        gr["Δvalue"] = gr["Δamount"] * gr.price
-        gr["total_spend"] = gr["Δvalue"].cumsum() + first.value
-        gr["avg_price"] = gr.total_spend / gr.amount
-        return gr
+def _add_avg_price(df, state=None, validate=False):
+    """Add ``avg_price`` to ``df`` and return it together with the per-symbol
+    state needed to continue the computation for newer rows.
 
+    The state is indexed by symbol and contains the last ``amount``, the
+    ``first_value`` of the symbol and ``Δvalue_sum``, the running sum of ``Δvalue``.
+    """
     df = df.reset_index(drop=True)
-    for _, gr in df.groupby("symbol"):
-        result = _add_avg_price(gr)
-        df.loc[gr.index, "avg_price"] = result["avg_price"]
-    return df
+    if state is None:
+        state = pd.DataFrame(
+            columns=["amount", "first_value", "Δvalue_sum"], dtype=float
+        )
+    # The state enters as one extra row per symbol, before the new rows
+    prev = state.rename_axis("symbol").reset_index()
+    n_prev = len(prev)
+    # ``value`` and ``price`` are missing if no entry of ``df`` has a value
+    new = df.reindex(columns=["symbol", "amount", "value", "price"])
+    if isinstance(new.symbol.dtype, pd.CategoricalDtype):
+        # Keep the symbols categorical, so the groupbys below operate on codes
+        categories = new.symbol.cat.categories.union(prev.symbol, sort=False)
+        dtype = pd.CategoricalDtype(categories)
+        prev["symbol"] = prev.symbol.astype(dtype)
+        new = new.astype({"symbol": dtype})
+    calc = pd.concat(
+        [prev[["symbol", "amount"]].assign(value=prev.first_value), new],
+        ignore_index=True,
+    )
+    by_symbol = calc.groupby("symbol", sort=False, observed=True)
+    Δamount = by_symbol.amount.diff()
+    Δvalue = Δamount * calc.price
+    seeded = Δvalue.fillna(0)
+    seeded.iloc[:n_prev] = prev["Δvalue_sum"].to_numpy(dtype=float)
+    running = seeded.groupby(calc.symbol, sort=False, observed=True).cumsum()
+
+    is_first = ~calc.symbol.duplicated()
+    first_values = pd.Series(calc.value[is_first].values, index=calc.symbol[is_first])
+    first_value = calc.symbol.map(first_values).astype(float)
+    total_spend = running.where(Δvalue.notna()) + first_value
+    df["avg_price"] = (total_spend / calc.amount).to_numpy()[n_prev:]
+
+    if validate:
+        first_amount = calc.amount[is_first].set_axis(calc.symbol[is_first])
+        is_last = ~calc.symbol.duplicated(keep="last")
+        last_amount = calc.amount[is_last].set_axis(calc.symbol[is_last])
+        error = (
+            Δamount.groupby(calc.symbol, observed=True).sum()
+            + first_amount
+            - last_amount
+        )
+        if (bad := error.abs() >= 1e-8).any():
+            raise ValueError(f"Inconsistent amounts for {list(error.index[bad])}.")
+
+    is_last = ~calc.symbol.duplicated(keep="last")
+    state = pd.DataFrame(
+        {
+            "amount": calc.amount[is_last].to_numpy(),
+            "first_value": first_value[is_last].to_numpy(),
+            "Δvalue_sum": running[is_last].to_numpy(),
+        },
+        index=pd.Index(calc.symbol[is_last].astype(object), name=None),
+    )
+    return df, state.astype(float)
 
 
-def denominate_in(df, symbol="BTC", norm=1):
-    df = df.copy()
-    values = []
-    for _, gr in df.groupby("date"):
-        cols = [x for x in gr.columns if x.startswith("value_in")]
-        cols += ["price", "value"]
-        p = gr[gr.symbol == symbol].price
-        values.append(norm * gr[cols].values / p.values[0])
+def add_avg_price(df, validate: bool = False):
+    """Add the ``avg_price`` (total spend divided by amount) per symbol.
 
-    df.loc[:, cols] = np.vstack(values)
-    df.loc[:, cols].fillna(0)
+    The total spend is the first value plus the cumulative value of all
+    changes in amount (``Δamount * price``). With ``validate=True`` it is
+    checked that the changes in amount add up to the last amount.
+    """
+    df, _ = _add_avg_price(df, validate=validate)
     return df
 
 
+def denominate_in(df, symbol="BTC", norm=1, missing="nan"):
+    """Express ``price``, ``value`` and the ``value_in_*`` columns in ``symbol``
+    (times ``norm``, e.g., ``norm=1e8`` for satoshis).
+
+    ``symbol`` can be a list of symbols, then ``{symbol: df}`` is returned
+    and ``norm`` can be a dict too. The base prices are joined on the date, and
+    dates on which a base symbol has no price get NaN (``missing="nan"``),
+    are dropped (``missing="drop"``), or raise a ValueError (``missing="raise"``).
+    """
+    if missing not in ("nan", "drop", "raise"):
+        raise ValueError("`missing` must be 'nan', 'drop', or 'raise'.")
+    symbols = [symbol] if isinstance(symbol, str) else list(symbol)
+    norms = norm if isinstance(norm, dict) else {s: norm for s in symbols}
+    cols = [c for c in df.columns if c.startswith("value_in")] + ["price", "value"]
+    base_prices = (
+        df[df.symbol.isin(symbols)]
+        .pivot(index="date", columns="symbol", values="price")
+        .reindex(columns=symbols)
+        .reindex(df.date)
+    )
+    values = df[cols].to_numpy(dtype=float)
+    dfs = {}
+    for base in symbols:
+        price = base_prices[base].to_numpy()
+        is_missing = np.isnan(price)
+        if missing == "raise" and is_missing.any():
+            dates = sorted(set(df.date[is_missing]))
+            raise ValueError(f"No {base} price on {len(dates)} dates: {dates}")
+        df_base = df.copy()
+        df_base[cols] = norms[base] * values / price[:, np.newaxis]
+        if missing == "drop":
+            df_base = df_base[~is_missing]
+        dfs[base] = df_base
+    return dfs[symbol] if isinstance(symbol, str) else dfs
+
+
+def snapshot_rows(
+    folder=Path("data"),
+    date: datetime.datetime | None = None,
+    prefix: str = "",
+    columnar: bool = False,
+) -> pd.DataFrame:
+    """The long ``(date, where, symbol, amount, price, value)`` rows of the last
+    snapshot at or before ``date`` (default now), read from a single JSON
+    file, or with ``columnar=True`` from `net_worth_tracker.store`."""
+    if date is None:
+        date = datetime.datetime.now()
+    if columnar:
+        return store.snapshot_at(folder, date)
+    latest = snapshot_index.latest(folder, prefix, ".json", end=date)
+    if latest is None:
+        return pd.DataFrame(columns=store.COLUMNS)
+    dt, fname = latest
+    return store.balances_to_rows(dt, _read_json(fname)["balances"])
+
+
+def _diff_side(rows, keys, renames) -> pd.DataFrame:
+    rows = rows.assign(symbol=rows.symbol.map(renames).fillna(rows.symbol))
+    amount = rows.amount.astype(float)
+    value = rows.value.astype(float).fillna(amount * rows.price.astype(float))
+    grouped = rows.assign(amount=amount, value=value).groupby(list(keys), sort=False)
+    summed = grouped[["amount", "value"]].sum(min_count=1)
+    # NaN if any of the merged entries has no value, like `datas_to_df`
+    summed["value"] = summed.value.mask(grouped.value.count() < grouped.size())
+    summed = summed[summed.amount != 0]
+    summed["price"] = summed.value / summed.amount
+    return summed
+
+
+def diff_rows(
+    before: pd.DataFrame,
+    after: pd.DataFrame,
+    keys=("where", "symbol"),
+    renames=RENAMES,
+) -> pd.DataFrame:
+    """Attribute the change in value between two snapshots (long rows as
+    returned by `snapshot_rows`) per ``keys``, sorted by the absolute change.
+
+    The ``change`` is split into an ``amount_effect`` (the change in amount at
+    the old price) and a ``price_effect`` (the change in price of the new
+    amount). A ``new`` holding is all amount effect at its new price and one
+    that is ``gone`` is all amount effect at its old price. Holdings without
+    a price have NaN values and effects.
+    """
+    b = _diff_side(before, keys, renames)
+    a = _diff_side(after, keys, renames)
+    out = b.join(a, how="outer", lsuffix="_before", rsuffix="_after")
+    new, gone = out.amount_before.isna(), out.amount_after.isna()
+    amount_before = out.amount_before.fillna(0)
+    amount_after = out.amount_after.fillna(0)
+    # A holding that is not there has the price of the other snapshot
+    price_before = out.price_before.mask(new, out.price_after)
+    price_after = out.price_after.mask(gone, out.price_before)
+    out["value_before"] = amount_before * price_before
+    out["value_after"] = amount_after * price_after
+    out["change"] = out.value_after - out.value_before
+    out["amount_effect"] = (amount_after - amount_before) * price_before
+    out["price_effect"] = (price_after - price_before) * amount_after
+    out["status"] = np.select(
+        [new, gone, amount_before == amount_after],
+        ["new", "gone", "unchanged amount"],
+        "changed amount",
+    )
+    return out.sort_values("change", key=np.abs, ascending=False)
+
+
+def diff_snapshots(
+    start: datetime.datetime,
+    end: datetime.datetime | None = None,
+    folder=Path("data"),
+    prefix: str = "",
+    columnar: bool = False,
+    keys=("where", "symbol"),
+    renames=RENAMES,
+) -> pd.DataFrame:
+    """What changed between the snapshots at ``start`` and ``end`` (default
+    now), see `diff_rows`; only these two snapshots are read."""
+    before = snapshot_rows(folder, start, prefix, columnar)
+    after = snapshot_rows(folder, end, prefix, columnar)
+    return diff_rows(before, after, keys, renames)
+
+
+def diff_panel(
+    df: pd.DataFrame,
+    start: datetime.datetime,
+    end: datetime.datetime | None = None,
+    panel: Panel | None = None,
+) -> pd.DataFrame:
+    """Like `diff_snapshots` but per symbol, from the `Panel` of ``df`` (the
+    frame of `datas_to_df`); pass the ``panel`` if it is built already."""
+    if end is None:
+        end = datetime.datetime.now()
+    if panel is None:
+        panel = Panel.from_df(df)
+    sampled = panel.asof([start, end])
+    before, after = (
+        pd.DataFrame(
+            {
+                "symbol": sampled.symbols,
+                "amount": sampled.amount[i],
+                "price": sampled.price[i],
+                "value": sampled.value[i],
+            }
+        ).dropna(subset=["amount"])
+        for i in range(2)
+    )
+    return diff_rows(before, after, keys=("symbol",), renames={})
+
+
 def date_of_birth():
     birthday = get_password("birthday", "me")  # in format "YYYY-MM-DD"
     return datetime.datetime(*map(int, birthday.split("-")))
@@ -0,0 +1,18 @@
+from net_worth_tracker import cache
+
+
+def test_disk_cache_binds_the_arguments_to_the_signature(tmp_path):
+    calls = []
+
+    @cache.disk_cache(ttl=cache.HOUR, folder=tmp_path)
+    def f(x, y=2, **kwargs):
+        calls.append((x, y, kwargs))
+        return x + y + sum(kwargs.values())
+
+    assert f(1) == f(x=1) == f(1, 2) == f(1, y=2) == 3
+    assert f(1, a=1, b=2) == f(1, b=2, a=1) == 6
+    assert len(calls) == 2
+    assert len(list(tmp_path.glob("*.pickle"))) == 2
+
+    assert f(1, cache=False) == 3
+    assert len(calls) == 3
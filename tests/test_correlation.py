@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from net_worth_tracker import correlation
+
+
+def _rows(n_dates=60, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2023-01-01", periods=n_dates, freq="1D")
+    rows = [
+        (date, symbol, rng.lognormal(5, 0.2))
+        for i, date in enumerate(dates)
+        for symbol in ("BTC", "ETH", "NEXO")
+        if symbol != "NEXO" or i % 3  # missing data
+    ]
+    return pd.DataFrame(rows, columns=["date", "symbol", "price"]).assign(value=1.0)
+
+
+def test_correlation_matches_pandas_and_follows_changes_of_the_frame():
+    df = _rows()
+    returns = correlation.log_returns(df)
+    moments = correlation.moments(df)
+    pd.testing.assert_frame_equal(moments.covariance(), returns.cov())
+    pd.testing.assert_frame_equal(moments.correlation(), returns.corr())
+
+    # The moments are cached per data version, not on the identity of the
+    # frame, so changing it in place is reflected in the next result
+    assert correlation.moments(df.copy()) is moments
+    df["price"] *= np.where(df.symbol == "BTC", np.linspace(1, 2, len(df)), 1)
+    expected = correlation.log_returns(df.copy()).corr()
+    assert not np.allclose(expected, returns.corr(), equal_nan=True)
+    pd.testing.assert_frame_equal(correlation.correlation(df), expected)
+
+
+def test_moments_are_recomputed_when_a_snapshot_is_added():
+    df = _rows()
+    moments = correlation.moments(df, window="30D")
+    assert correlation.moments(df, window="30D") is moments
+    assert correlation.moments(df, window="20D") is not moments
+
+    new = _rows(n_dates=61).iloc[len(df) :]
+    df = pd.concat([df, new], ignore_index=True)
+    result = correlation.moments(df, window="30D")
+    assert result is not moments
+    returns = correlation.log_returns(df).iloc[-30:]
+    pd.testing.assert_frame_equal(result.correlation(), returns.corr())
@@ -0,0 +1,62 @@
+import datetime
+import json
+
+from net_worth_tracker import delta
+
+
+def _balances(amounts, prices):
+    return {
+        where: {
+            symbol: dict(
+                amount=amount, price=prices[symbol], value=amount * prices[symbol]
+            )
+            for symbol, amount in bals.items()
+        }
+        for where, bals in amounts.items()
+    }
+
+
+def test_save_data_stores_price_only_changes_once_per_symbol(tmp_path):
+    t0 = datetime.datetime(2023, 1, 1)
+    amounts = {"binance": {"BTC": 0.1, "ETH": 2.0}, "ledger": {"BTC": 1.5}}
+    prices = {"BTC": 20_000.0, "ETH": 1_500.0}
+    snapshots = {}
+    for i in range(4):
+        date = t0 + datetime.timedelta(hours=i)
+        prices = {symbol: price * 1.01 for symbol, price in prices.items()}
+        snapshots[date] = _balances(amounts, prices)
+        fname = delta.save_data(snapshots[date], tmp_path, date=date)
+        if i:
+            data = json.loads(fname.read_text())
+            assert data["changed"] == {}
+            assert data["prices"] == prices
+
+    # An amount change only stores that entry (without its price)
+    date = t0 + datetime.timedelta(hours=4)
+    amounts["ledger"]["BTC"] = 1.6
+    snapshots[date] = _balances(amounts, prices)
+    fname = delta.save_data(snapshots[date], tmp_path, date=date)
+    data = json.loads(fname.read_text())
+    assert data["changed"] == {"ledger": {"BTC": {"amount": 1.6}}}
+    assert data["prices"] == {"BTC": prices["BTC"]}
+
+    # Nothing changed, so nothing is written
+    date = t0 + datetime.timedelta(hours=5)
+    assert (
+        delta.save_data(
+            snapshots[date - datetime.timedelta(hours=1)], tmp_path, date=date
+        )
+        is None
+    )
+
+    for date, balances in snapshots.items():
+        assert delta.snapshot_at(tmp_path, date) == (date, balances)
+
+
+def test_diff_keeps_entries_with_a_value_that_is_not_amount_times_price():
+    old = {"nexo": {"EUR": dict(amount=1.0, price=1.0, value=1.0)}}
+    new = {"nexo": {"EUR": dict(amount=1.0, price=1.0, value=1.5), "X": dict(amount=3)}}
+    d = delta.diff(old, new)
+    assert d["changed"] == new
+    assert d["prices"] == {}
+    assert delta.apply(old, d) == new
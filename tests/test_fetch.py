@@ -0,0 +1,47 @@
+import subprocess
+import sys
+import textwrap
+import time
+
+from net_worth_tracker import fetch
+
+
+def _sleep(seconds, result=None):
+    def f():
+        time.sleep(seconds)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return f
+
+
+def test_sources_are_timed_from_their_own_start():
+    sources = [
+        fetch.Source("a", _sleep(0.3, {"BTC": {"amount": 1}}), timeout=0.5),
+        fetch.Source("b", _sleep(0.3, ValueError("down")), timeout=0.5),
+        fetch.Source("c", _sleep(0.3, {"ETH": {"amount": 2}}), timeout=0.5),
+    ]
+    # One at a time, so the last source starts ~0.6 s after the first
+    balances, statuses = fetch.fetch_all(sources, max_workers=1)
+    assert balances == {"a": {"BTC": {"amount": 1}}, "c": {"ETH": {"amount": 2}}}
+    statuses = {s.name: s for s in statuses}
+    assert statuses["a"].ok and statuses["c"].ok
+    assert not statuses["b"].ok and "down" in statuses["b"].error
+    assert all(s.seconds < 0.5 for s in statuses.values())
+
+
+def test_a_timed_out_source_does_not_block_the_exit():
+    code = textwrap.dedent(
+        """
+        import time
+        from net_worth_tracker import fetch
+
+        source = fetch.Source("slow", lambda: time.sleep(60), timeout=0.1)
+        _, (status,) = fetch.fetch_all([source])
+        assert status.error == "timeout", status
+        """
+    )
+    t_start = time.monotonic()
+    subprocess.run([sys.executable, "-c", code], check=True, timeout=30)
+    assert time.monotonic() - t_start < 30
@@ -0,0 +1,50 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from net_worth_tracker import http_client
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """A server that returns an HTML error page (with status 200) for the
+    first ``server.n_errors`` requests and JSON afterwards."""
+    monkeypatch.setattr(http_client, "BACKOFF", 0)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            server.n_requests += 1
+            if server.n_requests <= server.n_errors:
+                body, content_type = b"<html>Bad gateway</html>", "text/html"
+            else:
+                body, content_type = b'{"result": 1}', "application/json"
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.n_requests, server.n_errors = 0, 2
+    server.url = f"http://127.0.0.1:{server.server_port}/"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_get_retries_when_ok_raises(server):
+    r = http_client.get(server.url, ok=lambda r: "result" in r.json())
+    assert r.json() == {"result": 1}
+    assert server.n_requests == 3
+
+
+def test_get_raises_the_error_of_ok_after_the_last_retry(server):
+    server.n_errors = 10
+    with pytest.raises(ValueError):
+        http_client.get(server.url, retries=2, ok=lambda r: "result" in r.json())
+    assert server.n_requests == 3
@@ -0,0 +1,69 @@
+from collections import deque
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from net_worth_tracker import lots
+
+
+def _reference(txs, method):
+    """The ``cost_basis`` after every transaction by keeping the lots."""
+    costs = []
+    for _, tx in txs.groupby("symbol", sort=True):
+        fifo = deque()  # [quantity, price] per lot
+        quantity = cost = 0.0
+        for amount, price in zip(tx.amount, np.nan_to_num(tx.price)):
+            if amount >= 0:
+                fifo.append([amount, price])
+                cost += amount * price
+            elif method == "fifo":
+                sell = -amount
+                while sell > 0 and fifo:
+                    lot = fifo[0]
+                    used = min(sell, lot[0])
+                    lot[0] -= used
+                    sell -= used
+                    if lot[0] == 0:
+                        fifo.popleft()
+            elif quantity > 0:
+                cost *= max(quantity + amount, 0) / quantity
+            else:
+                cost = 0.0
+            quantity += amount
+            if method == "fifo":
+                cost = sum(q * p for q, p in fifo)
+            costs.append(cost)
+    return np.array(costs)
+
+
+def _txs(seed):
+    """Transactions of a symbol with a huge amount of units and of symbols
+    with tiny amounts, with partial and full disposals."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for symbol, scale in [("AAA", 1e12), ("BBB", 1e-3), ("SHIB", 1e9), ("ZZZ", 1e-6)]:
+        dates = pd.date_range("2023-01-01", periods=30, freq="D")
+        holdings = 0.0
+        for date in dates:
+            if holdings > 0 and rng.random() < 0.4:
+                amount = -holdings * rng.choice([0.3, 0.5, 1.0])
+            else:
+                amount = scale * rng.uniform(0.1, 1)
+            holdings += amount
+            rows.append((date, symbol, amount, rng.lognormal(0, 1) / scale))
+    return pd.DataFrame(rows, columns=lots.TX_COLUMNS)
+
+
+@pytest.mark.parametrize("method", ["fifo", "average"])
+@pytest.mark.parametrize("seed", range(3))
+def test_ledger_equals_the_per_lot_reference(method, seed):
+    txs = _txs(seed)
+    result = lots.ledger(txs, method)
+    expected = _reference(result, method)
+    # Every symbol is on its own axis, so the tiny holdings keep their precision
+    for _, group in result.groupby("symbol"):
+        scale = group.amount.abs().max() * group.price.max()
+        np.testing.assert_allclose(
+            group.cost_basis, expected[group.index], rtol=1e-9, atol=1e-9 * scale
+        )
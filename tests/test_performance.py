@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from net_worth_tracker import performance
+from net_worth_tracker.panel import Panel
+
+
+def _rows(n_dates=200, seed=0):
+    """A `utils.datas_to_df`-like frame every 7 hours, with a symbol that
+    only appears halfway."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2023-01-01", periods=n_dates, freq="7H")
+    rows = []
+    for i, date in enumerate(dates):
+        symbols = ["BTC", "ETH"] + (["NEXO"] if i >= n_dates // 2 else [])
+        for symbol in symbols:
+            price = rng.lognormal(5, 0.2)
+            amount = rng.uniform(1, 2)
+            rows.append((date, symbol, amount, price, amount * price))
+    return pd.DataFrame(rows, columns=["date", "symbol", "amount", "price", "value"])
+
+
+def test_tracker_matches_summary_when_updated_with_new_rows(tmp_path):
+    df = _rows()
+    expected = performance.summary(df, windows=("1D", "7D"), vol_window="7D")
+
+    dates = df.date.unique()
+    for chunk in np.array_split(dates, 7):
+        tracker = performance.Tracker.load(tmp_path, ("1D", "7D"), "7D")
+        result = tracker.update(df[df.date.isin(chunk)])
+        tracker.save(tmp_path)
+    pd.testing.assert_frame_equal(result.loc[expected.index], expected)
+
+    # Rows that were processed already are ignored
+    tracker = performance.Tracker.load(tmp_path, ("1D", "7D"), "7D")
+    result = tracker.update(df)
+    pd.testing.assert_frame_equal(result.loc[expected.index], expected)
+
+
+def test_grid_and_cash_flows_see_in_place_changes_of_the_frame():
+    df = _rows(n_dates=50)
+    before = performance.grid(df)
+    value, _ = performance.cash_flows(df)
+
+    df["price"] *= 2
+    df["amount"] *= 3
+    df["value"] = df.amount * df.price
+    pd.testing.assert_frame_equal(performance.grid(df), performance.grid(df.copy()))
+    pd.testing.assert_frame_equal(performance.cash_flows(df)[0], 6 * value)
+    assert not performance.grid(df).equals(before)
+
+    # A panel that is built once gives the same results
+    panel = Panel.from_df(df)
+    pd.testing.assert_frame_equal(
+        performance.grid(df, panel=panel), performance.grid(df)
+    )
@@ -0,0 +1,69 @@
+import datetime
+import os
+
+from net_worth_tracker import snapshot_index, utils
+
+T0 = datetime.datetime(2023, 5, 1)
+
+
+def _touch(folder, date):
+    fname = utils.fname_from_date(folder, date)
+    fname.write_text("{}")
+    return fname
+
+
+def _sync(folder):
+    """Sync the index with an mtime of ``folder`` in the past, such that it is
+    trusted, and return that mtime."""
+    snapshot_index.query(folder)  # creates the index file
+    mtime = os.stat(folder).st_mtime - 3600
+    os.utime(folder, (mtime, mtime))
+    snapshot_index.query(folder)
+    return mtime
+
+
+def test_files_added_or_removed_by_other_means_are_picked_up(tmp_path):
+    fnames = [_touch(tmp_path, T0 + datetime.timedelta(hours=i)) for i in range(3)]
+    _sync(tmp_path)
+    assert list(snapshot_index.query(tmp_path).values()) == fnames
+
+    new = _touch(tmp_path, T0 + datetime.timedelta(hours=3))
+    assert snapshot_index.latest(tmp_path) == (T0 + datetime.timedelta(hours=3), new)
+
+    fnames[1].unlink()
+    assert list(snapshot_index.query(tmp_path).values()) == [fnames[0], fnames[2], new]
+
+
+def test_missing_files_are_skipped(tmp_path):
+    fnames = [_touch(tmp_path, T0 + datetime.timedelta(hours=i)) for i in range(3)]
+    mtime = _sync(tmp_path)
+
+    # Removed without changing the folder mtime, so the index is not synced
+    fnames[2].unlink()
+    os.utime(tmp_path, (mtime, mtime))
+    assert list(snapshot_index.query(tmp_path).values()) == fnames
+    assert list(utils.load_data(tmp_path, ndays=None)) == [
+        T0 + datetime.timedelta(hours=i) for i in range(2)
+    ]
+    assert len(list(utils.iter_snapshots(tmp_path))) == 2
+    assert snapshot_index.latest(tmp_path) == (
+        T0 + datetime.timedelta(hours=1),
+        fnames[1],
+    )
+
+
+def test_files_are_registered_after_they_are_written(tmp_path):
+    _touch(tmp_path, T0)
+    mtime = _sync(tmp_path)
+
+    # Not registered before it is written
+    date = T0 + datetime.timedelta(hours=1)
+    fname = utils.fname_from_date(tmp_path, date)
+    assert snapshot_index.latest(tmp_path)[0] == T0
+
+    # Written without changing the folder mtime, so only `add` registers it
+    fname.write_text("{}")
+    os.utime(tmp_path, (mtime, mtime))
+    assert snapshot_index.latest(tmp_path)[0] == T0
+    snapshot_index.add(fname)
+    assert snapshot_index.latest(tmp_path) == (date, fname)
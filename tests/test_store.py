@@ -0,0 +1,91 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from net_worth_tracker import store, utils
+
+
+def _write_snapshots(folder, now, n_days=120, seed=0):
+    """Snapshots every 6 hours, with BTC and ETH also held under other names."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(4 * n_days):
+        date = now - datetime.timedelta(hours=6 * i)
+        btc, eth = rng.lognormal(10, 0.05), rng.lognormal(7, 0.05)
+        # The wrapped tokens trade at a slightly different price
+        balances = {
+            "binance": {
+                "BTC": {"amount": rng.uniform(0.1, 1), "price": btc},
+                "ETH": {"amount": rng.uniform(1, 2), "price": eth},
+                "BNB": {"amount": rng.uniform(1, 2), "price": 300},
+            },
+            "bsc": {
+                "BTCB": {
+                    "amount": rng.uniform(0.1, 1),
+                    "price": btc * rng.uniform(0.9, 1.1),
+                },
+                "WETH": {
+                    "amount": rng.uniform(1, 2),
+                    "price": eth * rng.uniform(0.9, 1.1),
+                },
+                "WBNB": {
+                    "amount": rng.uniform(1, 2),
+                    "price": 300 * rng.uniform(0.9, 1.1),
+                },
+            },
+        }
+        for bals in balances.values():
+            for info in bals.values():
+                info["value"] = info["amount"] * info["price"]
+        rows.append(store.balances_to_rows(date, balances))
+    store.write(pd.concat(rows, ignore_index=True), folder)
+
+
+def test_compact_keeps_overview_with_renamed_symbols(tmp_path):
+    now = datetime.datetime.now().replace(microsecond=0)
+    _write_snapshots(tmp_path, now)
+    before = utils.overview_df(utils.long_to_df(store.read(tmp_path)))
+    # Keep everything within the horizons of `overview_df`
+    retention = ((datetime.timedelta(days=40), None), (None, "7D"))
+    removed = store.compact(tmp_path, retention=retention, now=now)
+    assert removed > 0
+    after = utils.overview_df(utils.long_to_df(store.read(tmp_path)))
+    pd.testing.assert_frame_equal(before, after)
+
+
+def test_compact_keeps_partitions_if_write_fails(tmp_path, monkeypatch):
+    now = datetime.datetime.now().replace(microsecond=0)
+    _write_snapshots(tmp_path, now)
+    before = store.read(tmp_path)
+
+    def fail(df, fname):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "_write", fail)
+    with pytest.raises(OSError):
+        store.compact(tmp_path, now=now)
+    pd.testing.assert_frame_equal(before, store.read(tmp_path))
+
+
+def test_append_and_compact_merges_appended_files(tmp_path):
+    now = datetime.datetime(2023, 5, 31, 12)
+    _write_snapshots(tmp_path, datetime.datetime(2023, 5, 1, 6), n_days=1)
+    dates = [now - datetime.timedelta(hours=i) for i in range(30)]
+    for i, date in enumerate(dates):
+        store.append(
+            {"binance": {"BTC": {"amount": i, "value": 2.0 * i}}}, tmp_path, date
+        )
+    before = store.read(tmp_path)
+    assert len(list((tmp_path / store.SUBFOLDER).glob("*.parquet"))) == 2 + len(dates)
+    at = store.snapshot_at(tmp_path, dates[0])
+    assert list(at.amount) == [0.0]
+    at = store.snapshot_at(tmp_path, datetime.datetime(2023, 4, 30, 23))
+    assert at.date.unique().tolist() == [datetime.datetime(2023, 4, 30, 18)]
+
+    retention = ((None, None),)
+    assert store.compact(tmp_path, retention=retention, now=now) == 0
+    fnames = sorted(p.name for p in (tmp_path / store.SUBFOLDER).glob("*.parquet"))
+    assert fnames == ["2023-04.parquet", "2023-05.parquet"]
+    pd.testing.assert_frame_equal(before, store.read(tmp_path))
@@ -0,0 +1,242 @@
+import datetime
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from net_worth_tracker import cache, cost_basis, store, utils
+
+
+def _save(folder, date, rng):
+    balances = {
+        "binance": {
+            "BTC": {"amount": rng.uniform(0.5, 1), "value": rng.uniform(1e4, 2e4)},
+            "ETH": {"amount": rng.uniform(1, 2), "value": rng.uniform(1e3, 2e3)},
+        },
+        "bsc": {
+            "BTCB": {"amount": rng.uniform(0.1, 1), "value": rng.uniform(1e3, 1e4)}
+        },
+    }
+    if date.day % 2:  # a wallet that is not in every snapshot
+        balances["nexo"] = {"NEXO": {"amount": 100.0, "value": rng.uniform(50, 150)}}
+    with utils.fname_from_date(folder, date).open("w") as f:
+        json.dump({"balances": balances}, f)
+
+
+def test_load_df_reuses_the_cache_when_the_window_slides(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    t0 = datetime.datetime(2023, 5, 1)
+    for i in range(20):
+        _save(tmp_path, t0 + datetime.timedelta(hours=12 * i), rng)
+
+    read_fnames = utils._read_fnames
+    read = []
+
+    def counting_read_fnames(fnames, **kwargs):
+        read.append(len(fnames))
+        return read_fnames(fnames, **kwargs)
+
+    monkeypatch.setattr(utils, "_read_fnames", counting_read_fnames)
+
+    def load(today):
+        """`load_df` of the last 5 days and the number of files it read."""
+
+        def min_date(ndays):
+            return today - datetime.timedelta(
+                days=365 * 100 if ndays is None else ndays
+            )
+
+        monkeypatch.setattr(utils, "_min_date", min_date)
+        read.clear()
+        df = utils.load_df(tmp_path, ndays=5)
+        n_read = sum(read)
+        expected = utils.load_df(tmp_path, ndays=5, cache=False)
+        # The wallet columns keep their order in the cached (full) frame
+        pd.testing.assert_frame_equal(df, expected, check_like=True)
+        return n_read
+
+    assert load(datetime.datetime(2023, 5, 9)) == 20  # builds the cache
+    # A day later the oldest snapshots fell out of the window and there is a new one
+    _save(tmp_path, datetime.datetime(2023, 5, 11), rng)
+    assert load(datetime.datetime(2023, 5, 10)) == 1
+    assert load(datetime.datetime(2023, 5, 10, 12)) == 0
+
+
+def test_read_json_is_cached_until_the_file_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_FOLDER", tmp_path / "cache")
+    fname = tmp_path / "export.json"
+    fname.write_text('{"balances": [1]}')
+
+    read_json = utils._read_json
+    read = []
+
+    def counting_read_json(fname, fast_json=False):
+        read.append(fname)
+        return read_json(fname, fast_json)
+
+    monkeypatch.setattr(utils, "_read_json", counting_read_json)
+    assert utils.read_json(fname) == utils.read_json(str(fname)) == {"balances": [1]}
+    assert len(read) == 1
+
+    fname.write_text('{"balances": [1, 2]}')
+    assert utils.read_json(fname) == {"balances": [1, 2]}
+    assert len(read) == 2
+
+
+def test_migrate_to_columnar_keeps_the_columnar_only_snapshots(tmp_path):
+    rng = np.random.default_rng(0)
+    t0 = datetime.datetime(2023, 5, 1)
+    for i in range(10):
+        _save(tmp_path, t0 + datetime.timedelta(hours=12 * i), rng)
+    assert utils.migrate_to_columnar(tmp_path) == 10
+
+    # Saved only in the columnar store, in a migrated and in a new month
+    balances = {"binance": {"BTC": {"amount": 1.0, "value": 2e4}}}
+    for date in [
+        t0 + datetime.timedelta(days=2, hours=1),
+        datetime.datetime(2023, 6, 1),
+    ]:
+        store.append(balances, tmp_path, date)
+    before = store.read(tmp_path)
+    assert before.date.nunique() == 12
+
+    assert utils.migrate_to_columnar(tmp_path) == 10
+    pd.testing.assert_frame_equal(store.read(tmp_path), before)
+
+
+def test_load_df_from_the_columnar_store_equals_the_json_path(tmp_path):
+    rng = np.random.default_rng(0)
+    t0 = datetime.datetime(2023, 5, 1)
+    for i in range(20):
+        _save(tmp_path, t0 + datetime.timedelta(hours=12 * i), rng)
+    utils.migrate_to_columnar(tmp_path)
+    kwargs = dict(ndays=None, ignore=["bsc"])
+    pd.testing.assert_frame_equal(
+        utils.load_df(tmp_path, columnar=True, **kwargs),
+        utils.load_df(tmp_path, cache=False, **kwargs),
+    )
+
+
+def _datas(n=30, seed=0):
+    """Snapshots with renamed, ignored, unpriced, zero and Beefy entries."""
+    rng = np.random.default_rng(seed)
+    t0 = datetime.datetime(2023, 5, 1)
+    symbols = ["BTC", "BTCB", "WBTC", "ETH", "WETH", "ADA", "mooBNB", "SHIB"]
+    datas = {}
+    for i in range(n):
+        balances = {}
+        for where in ["binance", "bsc", "nexo", "degiro"]:
+            bals = {}
+            for symbol in rng.choice(symbols, rng.integers(1, 5), replace=False):
+                info = {"amount": float(rng.choice([0, *rng.uniform(0, 10, 5)]))}
+                if rng.uniform() < 0.8:
+                    info["value"] = float(rng.choice([0, *rng.uniform(0, 1e4, 5)]))
+                bals[str(symbol)] = info
+            balances[where] = bals
+        datas[t0 + datetime.timedelta(hours=i)] = {"balances": balances}
+    return datas
+
+
+def _old_datas_to_df(datas, **kwargs):
+    """The per-snapshot loop that `long_to_df` replaced."""
+    dfs = [utils.data_to_df(date, data, **kwargs) for date, data in datas.items()]
+    return pd.concat(dfs).sort_values("date")
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_long_to_df_equals_the_per_snapshot_loop(seed):
+    datas = _datas(seed=seed)
+    kwargs = dict(ignore=["degiro"], ignore_symbols=["SHIB"])
+    new = utils._datas_to_df(datas, **kwargs, renames=utils.RENAMES)
+    old = _old_datas_to_df(datas, **kwargs)
+    assert list(new.columns) == list(old.columns)
+
+    def by_date_and_symbol(df):
+        return df.sort_values(["date", "symbol"], ignore_index=True)
+
+    pd.testing.assert_frame_equal(
+        by_date_and_symbol(new), by_date_and_symbol(old), check_exact=True
+    )
+
+
+def test_long_to_df_of_nothing_is_an_empty_frame():
+    datas = _datas(n=3)
+    ignore = ["binance", "bsc", "nexo", "degiro"]
+    for long in [utils._flatten(datas), store.read("does-not-exist")]:
+        df = utils.long_to_df(long, ignore=ignore)
+        assert df.empty
+        assert list(df.columns) == ["symbol", "date", "amount", "value", "price"]
+        assert df.date.dtype == "datetime64[ns]"
+        assert df.amount.dtype == df.value.dtype == float
+    assert utils.long_to_attribution(utils._flatten(datas), ignore=ignore).empty
+
+
+@pytest.mark.parametrize(
+    "balances",
+    [
+        {"degiro": {"ASML": {"amount": 1.0, "value": 600.0}}},  # all ignored
+        {"binance": {"BTC": {"amount": 1.0}, "ETH": {"amount": 2.0}}},  # no values
+    ],
+)
+def test_load_df_appends_snapshots_without_rows_or_values(tmp_path, balances):
+    rng = np.random.default_rng(0)
+    t0 = datetime.datetime(2023, 5, 1)
+    for i in range(10):
+        _save(tmp_path, t0 + datetime.timedelta(hours=12 * i), rng)
+    kwargs = dict(ndays=None, ignore=["degiro"])
+    utils.load_df(tmp_path, **kwargs)  # fills the cache
+    cost_basis.ingest(tmp_path, ignore=["degiro"])
+
+    date = t0 + datetime.timedelta(days=30)
+    with utils.fname_from_date(tmp_path, date).open("w") as f:
+        json.dump({"balances": balances}, f)
+    expected = utils.load_df(tmp_path, cache=False, **kwargs)
+    pd.testing.assert_frame_equal(utils.load_df(tmp_path, **kwargs), expected)
+
+    datas = utils.load_data(tmp_path, ndays=None)
+    df = utils.stream_datas_to_df(datas.items(), ignore=["degiro"], chunksize=10)
+    pd.testing.assert_frame_equal(df, expected)
+    only_new = utils.stream_datas_to_df({date: datas[date]}.items(), ignore=["degiro"])
+    assert len(only_new) == (0 if "degiro" in balances else 2)
+    new = cost_basis.ingest(tmp_path, ignore=["degiro"])
+    pd.testing.assert_frame_equal(new, only_new)
+
+
+def test_at_time_ago_of_an_unsorted_frame():
+    now = datetime.datetime(2023, 1, 2)
+    dates = pd.date_range("2023-01-01", now, freq="H")
+    df = pd.DataFrame(
+        {
+            "date": np.repeat(dates, 2),
+            "symbol": ["BTC", "ETH"] * len(dates),
+            "price": np.arange(2 * len(dates), dtype=float),
+        }
+    )
+    shuffled = df.sample(frac=1, random_state=0)
+    for hours in [0, 5, 24]:
+        time_ago = datetime.timedelta(hours=hours)
+        expected = utils.at_time_ago(df, time_ago, now=now)
+        assert len(expected) == 2
+        result = utils.at_time_ago(shuffled, time_ago, now=now)
+        pd.testing.assert_frame_equal(result.sort_index(), expected.sort_index())
+
+
+def test_diff_rows_of_partly_priced_renamed_entries_is_nan():
+    t0 = datetime.datetime(2023, 1, 1)
+    before = store.balances_to_rows(
+        t0,
+        {
+            "binance": {
+                "BTC": dict(amount=1, price=10, value=10),
+                "BTCB": dict(amount=1),
+            }
+        },
+    )
+    after = store.balances_to_rows(
+        t0, {"binance": {"BTC": dict(amount=1, price=20, value=20)}}
+    )
+    result = utils.diff_rows(before, after, keys=("symbol",)).loc["BTC"]
+    assert result.amount_before == 2
+    assert np.isnan(result.value_before)
+    assert np.isnan(result.change)